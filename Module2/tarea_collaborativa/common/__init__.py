@@ -0,0 +1,4 @@
+"""
+Modules shared by the football and F1 apps: the API rate limiter, the dataset handles
+used as cache keys and the background prefetcher.
+"""
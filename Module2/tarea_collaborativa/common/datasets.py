@@ -0,0 +1,63 @@
+import functools
+import hashlib
+import time
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class DatasetHandle:
+    """
+    Immutable handle on a fetched (or derived) dataset.
+
+    The fingerprint is computed once from where the data comes from (endpoint, params)
+    and from the fetch version, so caches can key on it in O(1) instead of hashing the
+    frame contents.
+
+    Args:
+        endpoint: API endpoint (or derived dataset name) the frame comes from.
+        params: request parameters.
+        frame: the data. Never modified; consumers get `view()`.
+        version: fetch version, defaults to the creation time of the handle.
+    """
+    endpoint: str
+    params: tuple
+    frame: pd.DataFrame = field(repr=False, compare=False)
+    version: str = field(default_factory=lambda: str(time.time_ns()))
+    fingerprint: str = field(init=False)
+
+    def __post_init__(self):
+        if isinstance(self.params, dict):
+            object.__setattr__(self, 'params', tuple(sorted(self.params.items())))
+        key = repr((self.endpoint, self.params, self.version)).encode()
+        object.__setattr__(self, 'fingerprint', hashlib.blake2b(key, digest_size=16).hexdigest())
+
+    def view(self) -> pd.DataFrame:
+        """
+        Shallow copy of the frame: adding or replacing columns never touches the handle's
+        frame, and with pandas copy-on-write enabled (as the apps do) neither do in-place edits.
+        """
+        return self.frame.copy(deep=False)
+
+    def derive(self, name, frame):
+        """Handle for a frame computed from this one; its fingerprint is chained to the parent's."""
+        return DatasetHandle(f"{self.endpoint}>{name}", self.params, frame, version=self.fingerprint)
+
+    def __len__(self):
+        return len(self.frame)
+
+
+# Da passare a st.cache_data(hash_funcs=...): la chiave e' il fingerprint, non il contenuto
+HASH_FUNCS = {DatasetHandle: lambda handle: handle.fingerprint}
+
+
+def on_view(func):
+    """
+    Adapts a function of a DataFrame to take a DatasetHandle: the function receives
+    `handle.view()`, the cache layer can hash the handle through its fingerprint.
+    """
+    @functools.wraps(func)
+    def wrapper(handle, *args, **kwargs):
+        return func(handle.view(), *args, **kwargs)
+    return wrapper
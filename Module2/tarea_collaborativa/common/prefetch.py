@@ -0,0 +1,91 @@
+import logging
+import threading
+import time
+import traceback
+
+from .rate_limiter import TokenBucket
+
+
+THREAD_NAME = "prefetch"
+
+
+class _PrefetchThreadFilter(logging.Filter):
+    # Il prefetch gira senza ScriptRunContext (nessuno spinner o messaggio nella pagina):
+    # l'avviso di Streamlit a ogni chiamata in cache qui e' atteso
+    def filter(self, record):
+        return threading.current_thread().name != THREAD_NAME
+
+
+def quiet_script_run_context_warnings():
+    """Drops Streamlit's missing-ScriptRunContext warnings raised from the prefetch thread."""
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(_PrefetchThreadFilter())
+
+
+class Prefetcher:
+    """
+    Background worker that warms the caches for the selections a user is likely to make
+    next (e.g. the seasons next to the one on screen).
+
+    Jobs run one at a time in a daemon thread and spend their own request budget: a token
+    bucket of `requests_per_minute`, separate from the API limiter. A job also waits until
+    the shared `limiter` has more than `reserve` tokens left on top of its cost, so
+    interactive requests always find room, and nothing is prefetched once the daily quota
+    reported by the API drops below `daily_reserve`.
+
+    Args:
+        limiter: TokenBucket of the API client (shared with interactive requests).
+        requests_per_minute: prefetch request budget.
+        reserve: tokens of `limiter` left for interactive requests.
+        daily_reserve: requests of the daily quota never used for prefetching.
+    """
+
+    def __init__(self, limiter, requests_per_minute=4, reserve=3, daily_reserve=50):
+        self.limiter = limiter
+        self.budget = TokenBucket.per_minute(requests_per_minute)
+        self.reserve = reserve
+        self.daily_reserve = daily_reserve
+        self._pending = []
+        self._done = set()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def schedule(self, jobs):
+        """
+        Replaces the pending jobs with `jobs`, most likely first: a new selection makes the
+        previous guesses obsolete. Jobs already run are skipped.
+
+        Args:
+            jobs: list of (key, cost, func), with cost = API requests `func` can make.
+        """
+        with self._cond:
+            self._pending = [job for job in jobs if job[0] not in self._done]
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=THREAD_NAME, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _within_daily_quota(self, cost):
+        daily = self.limiter.daily_remaining
+        return daily is None or daily - cost >= self.daily_reserve
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                key, cost, func = self._pending.pop(0)
+            if not self._within_daily_quota(cost):
+                continue
+
+            for _ in range(cost):
+                self.budget.acquire()
+            while self.limiter.available() < min(self.reserve + cost, self.limiter.capacity):
+                time.sleep(1)
+
+            try:
+                func()
+            except Exception:
+                # Un prefetch fallito non deve fermare il worker: la pagina rifara' la richiesta
+                traceback.print_exc()
+            with self._cond:
+                self._done.add(key)
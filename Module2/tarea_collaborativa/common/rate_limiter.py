@@ -0,0 +1,135 @@
+import datetime
+import threading
+import time
+
+import requests
+
+
+class QuotaExceeded(requests.exceptions.RequestException):
+    """The daily request quota of the API plan is used up."""
+
+
+def _utc_day():
+    return datetime.datetime.now(datetime.timezone.utc).date()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `capacity` requests can go out in a burst, then
+    tokens come back at `rate` per second.
+
+    The bucket also follows what the API says about the quota: `observe` reads the
+    api-sports rate-limit headers of every response, and `pause` blocks every caller
+    (e.g. for a Retry-After).
+
+    Args:
+        capacity: maximum number of tokens (burst size).
+        rate: tokens added per second (e.g. 10 / 60 for 10 requests per minute).
+    """
+
+    def __init__(self, capacity, rate):
+        self.capacity = capacity
+        self.rate = rate
+        self.daily_remaining = None
+        self._daily_day = None
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute):
+        return cls(capacity=requests_per_minute, rate=requests_per_minute / 60)
+
+    def _refill(self):
+        now = time.monotonic()
+        if now <= self._last:  # in pausa
+            return
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self):
+        """Blocks until a token is available and takes it."""
+        while True:
+            with self._lock:
+                if self.daily_remaining == 0 and self._daily_day == _utc_day():
+                    raise QuotaExceeded("daily request quota exhausted")
+                self._refill()
+                wait = self._paused_until - time.monotonic()
+                if wait <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def available(self):
+        """Tokens that could be taken right now without waiting."""
+        with self._lock:
+            self._refill()
+            if self._paused_until > time.monotonic():
+                return 0.0
+            return self._tokens
+
+    def pause(self, seconds):
+        """No token is handed out for the next `seconds`; then the bucket restarts with one token."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 1.0
+            self._last = self._paused_until
+
+    def observe(self, headers):
+        """
+        Aligns the bucket with the quota reported by the API:
+        X-RateLimit-Limit / X-RateLimit-Remaining (per minute) and
+        x-ratelimit-requests-remaining (per day).
+        """
+        def header(name):
+            value = headers.get(name)
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return None
+
+        per_minute = header("X-RateLimit-Limit")
+        remaining = header("X-RateLimit-Remaining")
+        daily = header("x-ratelimit-requests-remaining")
+        with self._lock:
+            self._refill()
+            if per_minute and per_minute != self.capacity:
+                self.capacity, self.rate = per_minute, per_minute / 60
+            if remaining is not None:
+                # Il server sa quante richieste restano davvero in questo minuto
+                self._tokens = min(self._tokens, remaining)
+            if daily is not None:
+                # la quota giornaliera di api-sports si azzera a mezzanotte UTC
+                self.daily_remaining, self._daily_day = daily, _utc_day()
+
+
+def rate_limited_get(session, limiter, url, params=None, max_retries=3):
+    """
+    GET through `limiter`, returning the JSON payload.
+
+    The limiter is updated from the rate-limit headers of every response. A 429, or an
+    api-sports `rateLimit` error (which comes back with status 200), pauses the limiter
+    for Retry-After seconds (or one token interval) and the request is retried.
+    """
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        r = session.get(url, params=params)
+        limiter.observe(r.headers)
+
+        rate_limited = r.status_code == 429
+        if not rate_limited and r.ok:
+            payload = r.json()
+            errors = payload.get("errors")
+            rate_limited = isinstance(errors, dict) and "rateLimit" in errors
+            if not rate_limited:
+                return payload
+
+        if rate_limited and attempt < max_retries:
+            retry_after = r.headers.get("Retry-After")
+            limiter.pause(float(retry_after) if retry_after else 1 / limiter.rate)
+            continue
+        r.raise_for_status()  # Check if the request was successful
+        raise requests.exceptions.HTTPError(f"rate limit still exceeded after {max_retries} retries", response=r)
@@ -1,84 +1,221 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
-import requests
-import pandas as pd
-import time
+
+from common.datasets import DatasetHandle
+from common.prefetch import Prefetcher, quiet_script_run_context_warnings
+from f1_assets import get_image_cache
+from f1_client import F1Client
+from f1_data_preprocessing import (
+    SEASON_ENDPOINTS, fetch_seasons, fetch_season_table, iter_fastest_laps, iter_seasons_fastest_laps, compute_super_times,
+    compute_multi_season_super_times
+)
+from f1_store import DEFAULT_PATH, F1Store
+from f1_super_time_matrix import SuperTimeMatrix
 
 
-# Set your API key
-API_BASE = "https://v1.formula-1.api-sports.io"
-API_KEY = st.secrets["api_f1"]["API_F1_KEY"]
+@st.cache_resource
+def get_client():
+    # La chiave viene letta alla prima richiesta, non all'import del modulo
+    return F1Client(st.secrets["api_f1"]["API_F1_KEY"])
 
-headers = {
-    "x-apisports-key": API_KEY,
-    "x-rapidapi-host": "v1.formula-1.api-sports.io"
-}
+@st.cache_resource
+def get_store():
+    # Warehouse locale (riempito anche da f1_ingest.py): le stagioni salvate non fanno richieste
+    DEFAULT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    return F1Store(DEFAULT_PATH)
 
 @st.cache_data
 def api_get(endpoint, params=None, debug=False):
-    resp = requests.get(f"{API_BASE}/{endpoint}", headers=headers, params=params)
-    resp.raise_for_status()
-    if debug:
-        print(resp.text)
-    return resp.json().get("response", [])
+    return get_client().get(endpoint, params=params, debug=debug)
+
+@st.cache_data
+def get_seasons():
+    return fetch_seasons(get_client(), store=get_store())
+
 
 @st.cache_data
-def get_races(endpoint='races', params=None):
-    return api_get(endpoint, params=params)
+def get_races(season):
+    return fetch_season_table(get_client(), "races", season, store=get_store())
 
 
 @st.cache_data
-def get_rankings_drivers(endpoint='rankings/drivers', params=None):
-    return api_get(endpoint, params=params)
+def get_rankings_drivers(season):
+    return fetch_season_table(get_client(), "rankings/drivers", season, store=get_store())
 
 
 @st.cache_data
-def get_rankings_teams(endpoint='rankings/teams', params=None):
-    return api_get(endpoint, params=params)
+def get_rankings_teams(season):
+    return fetch_season_table(get_client(), "rankings/teams", season, store=get_store())
+
+
+@st.cache_resource
+def _loaded_fastest_laps():
+    # stagione -> (races, laps), condiviso tra sessioni e rerun
+    return {}
+
+
+def fastest_laps_loaded(season: int) -> bool:
+    return season in _loaded_fastest_laps()
+
+
+def stream_fastest_laps_by_season(season: int):
+    """
+    Yields (races, laps, done) every time a race arrives, so the page can draw
+    partial results. A season already loaded is yielded once, complete.
+    """
+    loaded = _loaded_fastest_laps()
+    if season in loaded:
+        races, laps = loaded[season]
+        yield races, laps, len(races)
+        return
+
+    for races, laps, done in iter_fastest_laps(get_client(), season, store=get_store()):
+        yield races, laps, done
+    loaded[season] = (races, laps)
+
+
+@st.cache_resource
+def _background_loads():
+    # stagione -> {"future", "progress"}: caricamenti in corso fuori dal thread della pagina
+    return {}, threading.Lock(), ThreadPoolExecutor(max_workers=2, thread_name_prefix="f1-super-time")
+
+
+def load_fastest_laps_in_background(season: int) -> dict:
+    """
+    Starts loading the fastest laps of `season` in a background thread (once per season,
+    shared by every session) and returns its state: "future" resolves to (races, laps),
+    "progress" holds the latest (races, laps, done) so the page can draw partial results.
+    """
+    loads, lock, pool = _background_loads()
+    with lock:
+        load = loads.get(season)
+        if load is None or (load["future"].done() and load["future"].exception() is not None):
+            load = {"progress": None}
+            # Risorse in cache lette qui: il thread in background non chiama funzioni Streamlit
+            client, store, loaded = get_client(), get_store(), _loaded_fastest_laps()
+
+            def run():
+                if season in loaded:
+                    return loaded[season]
+                for races, laps, done in iter_fastest_laps(client, season, store=store):
+                    load["progress"] = (races, laps, done)
+                loaded[season] = (races, laps)
+                return races, laps
+
+            load["future"] = pool.submit(run)
+            loads[season] = load
+    return load
+
 
+def get_fastest_laps_by_season(season: int) -> tuple:
+    for races, laps, _ in stream_fastest_laps_by_season(season):
+        pass
+    return races, laps
 
-@st.cache_data(show_spinner="Loading Super Time...")
-def get_super_times_by_season(season: int) -> dict:
 
-    def time_to_ms(t):
-        minutes, seconds = t.split(":")
-        return (int(minutes) * 60 + float(seconds)) * 1000
+@st.cache_resource
+def get_super_time_table_handle(season: int) -> DatasetHandle:
+    races, laps = get_fastest_laps_by_season(season)
+    return DatasetHandle("rankings/fastestlaps>super_time", {"season": season},
+                         compute_super_times(races, laps))
 
+
+@st.cache_resource
+def get_super_time_matrix(season: int) -> SuperTimeMatrix:
+    return SuperTimeMatrix(get_super_time_table_handle(season).frame)
+
+
+@st.cache_resource
+def get_super_time_handle(season: int, by: str = "driver") -> DatasetHandle:
+    # Pilota / team: slice delle matrici gia' calcolate
+    return get_super_time_table_handle(season).derive(by, get_super_time_matrix(season).frame(by))
+
+
+def stream_fastest_laps_by_seasons(seasons):
     """
-    Calcola i Super Time per tutte le gare di una stagione.
-    Rispetta il rate limit di 10 richieste al minuto.
-    
-    Restituisce:
-        - races (DataFrame con le gare)
-        - super_times (dict con i tempi e info per ogni gara)
+    Loads several seasons concurrently (one shared rate limiter), yielding each season
+    as it completes. Seasons already loaded, or complete in the store, make no request.
     """
-    super_times = {}
-    
-    races = pd.json_normalize(api_get("races", {"season": season, "type": "Race"}, debug=True))
-    
-    for i, (_, race) in enumerate(races.iterrows()):
-        race_id = race["id"]
-        race_name = race["competition.name"] + " - " + race["circuit.name"]
-        
-        try:
-            best_laps = api_get("rankings/fastestlaps", {"race": race_id})
-        except Exception as e:
-            print(f"Errore nella richiesta per race {race_id}: {e}")
-            continue
-        
-        # Delay tra richieste per rispettare il limite
-        time.sleep(6.5)  # ≈ 9 richieste al minuto = sicuro
-        
-        best_laps_df = pd.json_normalize(best_laps)
-        
-        if not best_laps_df.empty:
-            best_laps_df["time_ms"] = best_laps_df["time"].apply(time_to_ms)
-            best_laps_df["superTimeRatio"] = best_laps_df["time_ms"] / best_laps_df["time_ms"].min()
-            best_laps_df["superTimeDelta"] = best_laps_df["superTimeRatio"] - 1
-            best_laps_df["superTimeDelta%"] = (best_laps_df["superTimeDelta"] * 100).round(2)
-
-            super_times[race_id] = {
-                "race_name": race_name,
-                "data": best_laps_df
-            }
-
-    return races, super_times
\ No newline at end of file
+    loaded = _loaded_fastest_laps()
+    for season in seasons:
+        if season in loaded:
+            yield season
+    # Le stagioni gia' in caricamento in background non si scaricano due volte
+    loads, _, _ = _background_loads()
+    running = [season for season in seasons if season not in loaded and season in loads
+               and not (loads[season]["future"].done() and loads[season]["future"].exception() is not None)]
+    missing = [season for season in seasons if season not in loaded and season not in running]
+    for season, races, laps in iter_seasons_fastest_laps(get_client(), missing, store=get_store()):
+        loaded[season] = (races, laps)
+        yield season
+    for season in running:
+        loads[season]["future"].result()
+        yield season
+
+
+@st.cache_resource
+def get_multi_season_table_handle(seasons: tuple) -> DatasetHandle:
+    for _ in stream_fastest_laps_by_seasons(seasons):
+        pass
+    loaded = _loaded_fastest_laps()
+    return DatasetHandle("rankings/fastestlaps>super_time", {"seasons": seasons},
+                         compute_multi_season_super_times({season: loaded[season] for season in seasons}))
+
+
+@st.cache_resource
+def get_multi_season_matrix(seasons: tuple) -> SuperTimeMatrix:
+    return SuperTimeMatrix(get_multi_season_table_handle(seasons).frame)
+
+
+@st.cache_resource
+def get_multi_season_handle(seasons: tuple, by: str = "driver") -> DatasetHandle:
+    """Season-average super time per entity for `seasons`."""
+    return get_multi_season_table_handle(seasons).derive(
+        f"{by}>season_average", get_multi_season_matrix(seasons).season_average(by))
+
+
+@st.cache_resource
+def get_prefetcher():
+    quiet_script_run_context_warnings()
+    return Prefetcher(get_client().limiter)
+
+
+def _warm_season_kpis(season):
+    get_races(season)
+    drivers = get_rankings_drivers(season)
+    teams = get_rankings_teams(season)
+    # Immagini delle tabelle top 10: nessuna richiesta all'API
+    get_image_cache().prefetch([d["driver"]["image"] for d in drivers[:10]] + [t["team"]["logo"] for t in teams[:10]])
+
+
+def _warm_season_super_time(season):
+    get_fastest_laps_by_season(season)
+    get_super_time_matrix(season)
+
+
+def prefetch_adjacent_seasons(season, seasons):
+    """
+    Warms the caches of the seasons next to `season` (the previous one first) in the
+    background, within the prefetch request budget: races and rankings (3 requests each,
+    none if the season is complete in the local store), and the super times of seasons
+    whose laps are all stored as final (no requests). A season of super times not stored
+    yet costs one request per race and is left to the page.
+    """
+    seasons = sorted(seasons)
+    position = seasons.index(season)
+    neighbours = [seasons[i] for i in (position - 1, position + 1) if 0 <= i < len(seasons)]
+    store = get_store()
+
+    def kpis_cost(s):
+        stored = all(store.has_season(endpoint, s, final=True) for endpoint in SEASON_ENDPOINTS)
+        return 0 if stored else len(SEASON_ENDPOINTS)
+
+    # Una stagione "finale" per le gare (salvate dal prefetch dei KPI) puo' non avere ancora i giri
+    jobs = [(("super_time", s), 0, lambda s=s: _warm_season_super_time(s))
+            for s in neighbours if store.season_laps_are_final(s)]
+    jobs += [(("kpis", s), kpis_cost(s), lambda s=s: _warm_season_kpis(s)) for s in neighbours]
+    # Prima i job dal disco (costo 0), che non aspettano il budget
+    jobs.sort(key=lambda job: job[1] > 0)
+    get_prefetcher().schedule(jobs)
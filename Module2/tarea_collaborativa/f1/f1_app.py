@@ -1,14 +1,37 @@
 # pages/1_Season_Analysis.py
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import pandas as pd
-import plotly.graph_objects as go
-from PIL import Image
-import requests
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # Funzione per richiamare l’API (già disponibile)
-from data_viz import create_top10_table_image_f1, plot_super_time
-from api_f1_call import * 
-from f1_data_preprocessing import build_super_time_dataframe 
+from f1_data_viz import create_top10_table_image_f1, figure_to_png, plot_super_time, plot_super_time_trend
+from api_f1_call import (
+    get_seasons, get_races, get_rankings_drivers, get_rankings_teams, get_super_time_handle, get_multi_season_handle,
+    load_fastest_laps_in_background, stream_fastest_laps_by_seasons, fastest_laps_loaded, prefetch_adjacent_seasons
+)
+from f1_data_preprocessing import build_super_time_dataframe
+from common.datasets import HASH_FUNCS, on_view
+
+# Le viste passate ai grafici non possono modificare i dati in cache
+pd.set_option("mode.copy_on_write", True)
+super_time_chart = st.cache_data(hash_funcs=HASH_FUNCS)(on_view(plot_super_time))
+super_time_trend_chart = st.cache_data(hash_funcs=HASH_FUNCS)(on_view(plot_super_time_trend))
+
+
+@st.cache_data(show_spinner=False)
+def top10_table_png(season, metric_visible_name, _table_df, id_column, img_width):
+    # PNG della tabella per stagione e metrica: la tabella (da _table_df) non entra nella chiave
+    return figure_to_png(create_top10_table_image_f1(
+        _table_df,
+        selected_id=None,
+        id_column=id_column,
+        metric_visible_name=metric_visible_name,
+        img_width=img_width
+    ))
+
 
 # --- PAGE CONFIG ---
 st.set_page_config(page_title="Season Analysis", layout="wide")
@@ -17,25 +40,23 @@ st.set_page_config(page_title="Season Analysis", layout="wide")
 st.title("🏎️ Season Analysis")
 
 # --- SEASON SELECTOR ---
-season = st.selectbox("Select a season", [2021, 2022, 2023])
-
+# Stagioni coperte dal piano gratuito di API-Sports: la pagina si apre sull'ultima di queste,
+# le altre stagioni possono avere classifiche vuote (non iniziate o fuori dal piano)
+PLAN_SEASONS = (2021, 2022, 2023)
 
-# --- KPI: Number of Races ---
-races_data = get_races("races", {"season": season, "type": "Race"})
-num_races = len(races_data)
+all_seasons = sorted(get_seasons(), reverse=True)
+default_season = max((s for s in all_seasons if s in PLAN_SEASONS), default=None)
+season = st.selectbox("Select a season", all_seasons,
+                      index=all_seasons.index(default_season) if default_season is not None else 0)
 
-# --- KPI: Winning Driver ---
-drivers_rankings = get_rankings_drivers("rankings/drivers", {"season": season})
-winner_driver = drivers_rankings[0]
 
-# --- KPI: Winning Team ---
-teams_rankings = get_rankings_teams("rankings/teams", {"season": season})
-winner_team = teams_rankings[0]
+# Il Super Time (il caricamento piu' lungo) parte subito in background
+super_time_load = load_fastest_laps_in_background(season)
 
-# --- KPI LAYOUT ---
-col1, col2, col3 = st.columns(3)
 
-with col1:
+# --- KPI: Number of Races ---
+def gp_card(races_data):
+    num_races = len(races_data)
     gp_html = f"""
     <style>
         .gp-card {{
@@ -99,7 +120,12 @@ with col1:
     """
     st.markdown(gp_html, unsafe_allow_html=True)
 
-with col2:
+# --- KPI: Winning Driver ---
+def driver_card(drivers_rankings):
+    if not drivers_rankings:
+        st.info("No driver standings for this season.")
+        return
+    winner_driver = drivers_rankings[0]
     with st.container():
         driver_name = winner_driver['driver']['name']
         driver_points = winner_driver['points']
@@ -167,7 +193,12 @@ with col2:
 
         st.markdown(driver_html, unsafe_allow_html=True)
 
-with col3:
+# --- KPI: Winning Team ---
+def team_card(teams_rankings):
+    if not teams_rankings:
+        st.info("No team standings for this season.")
+        return
+    winner_team = teams_rankings[0]
     team_name = winner_team['team']['name']
     team_points = winner_team['points']
     team_img_url = winner_team['team']['logo']
@@ -237,12 +268,9 @@ with col3:
     st.markdown(team_html, unsafe_allow_html=True)
 
 
-st.write("")
-
-drivers, teams = st.columns(2)
-
-
-with drivers:
+def drivers_table(drivers_rankings):
+    if not drivers_rankings:
+        return
     df_drivers = pd.DataFrame([
     {
         "rank": d["position"],
@@ -259,18 +287,13 @@ with drivers:
     
 
 
-    fig = create_top10_table_image_f1(
-        df_drivers,
-        selected_id=None,
-        id_column="driver_id",
-        metric_visible_name="Drivers",
-        img_width=0.35
-    )
-
-    st.pyplot(fig)
+    st.image(top10_table_png(season, "Drivers", df_drivers, id_column="driver_id", img_width=0.35),
+             use_container_width=True)
 
 
-with teams:
+def teams_table(teams_rankings):
+    if not teams_rankings:
+        return
     df_teams = pd.DataFrame([
         {
             "rank": t["position"],
@@ -282,15 +305,32 @@ with teams:
         for t in teams_rankings
     ])
 
-    fig = create_top10_table_image_f1(
-        df_teams,
-        selected_id=None,
-        id_column="team_id",
-        metric_visible_name="Team",
-        img_width=0.2
-    )
+    st.image(top10_table_png(season, "Team", df_teams, id_column="team_id", img_width=0.2),
+             use_container_width=True)
 
-    st.pyplot(fig)
+
+# --- KPI LAYOUT ---
+col1, col2, col3 = st.columns(3)
+st.write("")
+drivers, teams = st.columns(2)
+
+# Le tre richieste della stagione partono insieme; ogni riquadro compare appena arrivano i suoi dati
+sections = {
+    "races": [(col1, gp_card)],
+    "drivers": [(col2, driver_card), (drivers, drivers_table)],
+    "teams": [(col3, team_card), (teams, teams_table)],
+}
+ctx = get_script_run_ctx()
+with ThreadPoolExecutor(max_workers=3, initializer=lambda: add_script_run_ctx(ctx=ctx)) as pool:
+    futures = {
+        pool.submit(get_races, season): "races",
+        pool.submit(get_rankings_drivers, season): "drivers",
+        pool.submit(get_rankings_teams, season): "teams",
+    }
+    for future in as_completed(futures):
+        for container, render in sections[futures[future]]:
+            with container:
+                render(future.result())
 
 
 super_by = st.selectbox(
@@ -300,8 +340,57 @@ super_by = st.selectbox(
 )
 
 
-races, super_times = get_super_times_by_season(season)
-super_time_df = build_super_time_dataframe(races, super_times=super_times, by=super_by.lower())
-
-fig = plot_super_time(df=super_time_df, by=super_by.lower())
-st.plotly_chart(fig)
\ No newline at end of file
+# Secondi tra un aggiornamento e l'altro del grafico parziale
+SUPER_TIME_POLL = 0.5
+
+
+def super_time_section(by, polling):
+    if fastest_laps_loaded(season):
+        if polling:
+            # Caricamento finito: un rerun dell'app ferma il polling e ridisegna le sezioni che lo aspettavano
+            st.rerun()
+        st.plotly_chart(super_time_chart(get_super_time_handle(season, by=by), by=by))
+        return
+
+    # Prima volta per questa stagione: il grafico si aggiorna man mano che il caricamento
+    # in background riceve le gare, senza bloccare il resto della pagina
+    if super_time_load["future"].done():
+        super_time_load["future"].result()  # errori del caricamento
+    state = super_time_load["progress"]
+    if state is None:
+        st.progress(0.0, text="Loading Super Time...")
+        return
+    races, laps, done = state
+    st.progress(done / max(len(races), 1), text=f"Loading Super Time... {done}/{len(races)} races")
+    if not laps.empty:
+        partial_df = build_super_time_dataframe(races, laps, by=by)
+        st.plotly_chart(plot_super_time(df=partial_df, by=by), key=f"super_time_partial_{done}")
+
+
+loading = not fastest_laps_loaded(season)
+st.fragment(run_every=SUPER_TIME_POLL if loading else None)(super_time_section)(super_by.lower(), polling=loading)
+
+# Le stagioni vicine si preparano in background mentre si guarda questa
+prefetch_adjacent_seasons(season, all_seasons)
+
+
+# --- SUPER TIME ACROSS SEASONS ---
+st.header("Super Time across seasons")
+
+# Di default solo la stagione selezionata (gia' caricata): ogni stagione in piu' costa una richiesta per gara
+trend_seasons = st.multiselect("Seasons", sorted(all_seasons), default=[season])
+
+if season in trend_seasons and loading:
+    # La stagione selezionata si sta ancora caricando: il grafico compare al rerun di fine caricamento
+    st.info(f"Waiting for the {season} Super Time to load...")
+elif trend_seasons:
+    trend_seasons = tuple(sorted(trend_seasons))
+    if not all(fastest_laps_loaded(s) for s in trend_seasons):
+        # Le stagioni mancanti si scaricano in parallelo; quelle salvate arrivano dal disco
+        progress = st.progress(0.0, text="Loading seasons...")
+        for done, loaded_season in enumerate(stream_fastest_laps_by_seasons(trend_seasons), start=1):
+            progress.progress(done / len(trend_seasons), text=f"Loading seasons... {loaded_season} ({done}/{len(trend_seasons)})")
+        progress.empty()
+
+    super_time_trend = get_multi_season_handle(trend_seasons, by=super_by.lower())
+    st.plotly_chart(super_time_trend_chart(super_time_trend, by=super_by.lower()))
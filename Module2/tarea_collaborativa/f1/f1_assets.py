@@ -0,0 +1,165 @@
+import functools
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+from urllib.request import urlopen
+
+import numpy as np
+
+
+ASSETS_DIR = Path(__file__).parent / "data" / "assets"
+
+# Font distribuiti con il progetto (opzionali): hanno la precedenza sulla cache locale
+BUNDLED_FONTS_DIR = Path(__file__).parent / "fonts"
+
+fonts_dictionary = {
+    'Relaway':{ # per cercare altri font Relaway -> https://github.com/cyrealtype/Raleway/raw/master/fonts/ttf/
+        'bold':'https://github.com/cyrealtype/Raleway/raw/master/fonts/ttf/Raleway-Bold.ttf',
+        'regular': 'https://github.com/cyrealtype/Raleway/raw/master/fonts/ttf/Raleway-Regular.ttf',
+        'italic' : 'https://github.com/cyrealtype/Raleway/raw/master/fonts/ttf/Raleway-Italic.ttf',
+        'medium' : 'https://github.com/cyrealtype/Raleway/raw/master/fonts/ttf/Raleway-Medium.ttf',
+        'bold_italic': 'https://github.com/cyrealtype/Raleway/raw/master/fonts/ttf/Raleway-BoldItalic.ttf',
+        'semibold': 'https://github.com/cyrealtype/Raleway/raw/master/fonts/ttf/Raleway-SemiBold.ttf'
+    }
+}
+
+# Lato massimo (in pixel) delle immagini decodificate tenute in memoria
+MAX_IMAGE_SIDE = 256
+
+
+class CachedImage(NamedTuple):
+    pixels: np.ndarray  # RGBA uint8, (height, width, 4)
+    scale: float        # lato originale / lato in memoria: zoom * scale = zoom sull'originale
+
+
+def _write_atomic(path, data):
+    # File temporaneo unico: piu' thread (pagina, prefetch, altre sessioni) possono scrivere lo stesso file
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.name, suffix=".tmp", delete=False) as tmp:
+        tmp.write(data)
+    try:
+        os.replace(tmp.name, path)
+    except OSError:
+        os.unlink(tmp.name)
+        raise
+
+
+class ImageCache:
+    """
+    Cache of remote images (driver pictures, team logos).
+
+    Bytes are kept in a content-addressed store on disk (`blobs/<sha256>`, with
+    `refs/<hash of url>` pointing to the blob), so every URL is downloaded once; decoded
+    RGBA arrays, downscaled to `max_side`, are kept in an in-memory LRU of `max_items`.
+
+    Args:
+        path: directory of the disk store.
+        max_items: size of the in-memory LRU.
+        max_side: longest side of the decoded images kept in memory.
+    """
+
+    def __init__(self, path=ASSETS_DIR / "images", max_items=256, max_side=MAX_IMAGE_SIDE):
+        self.path = Path(path)
+        self.max_items = max_items
+        self.max_side = max_side
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+        (self.path / "blobs").mkdir(parents=True, exist_ok=True)
+        (self.path / "refs").mkdir(parents=True, exist_ok=True)
+
+    def _ref(self, url):
+        return self.path / "refs" / hashlib.blake2b(url.encode(), digest_size=16).hexdigest()
+
+    def fetch(self, url):
+        """Image bytes of `url`, downloaded only if not in the disk store."""
+        ref = self._ref(url)
+        if ref.exists():
+            blob = self.path / "blobs" / ref.read_text()
+            if blob.exists():
+                return blob.read_bytes()
+
+        with urlopen(url, timeout=10) as response:
+            data = response.read()
+        digest = hashlib.sha256(data).hexdigest()
+        blob = self.path / "blobs" / digest
+        if not blob.exists():
+            _write_atomic(blob, data)
+        _write_atomic(ref, digest.encode())
+        return data
+
+    def get(self, url) -> CachedImage:
+        """Decoded RGBA image of `url`, from memory, disk or network (in this order)."""
+        with self._lock:
+            if url in self._images:
+                self._images.move_to_end(url)
+                return self._images[url]
+
+        from io import BytesIO
+        from PIL import Image
+
+        image = Image.open(BytesIO(self.fetch(url))).convert("RGBA")
+        side = max(image.size)
+        if side > self.max_side:
+            image.thumbnail((self.max_side, self.max_side), Image.LANCZOS)
+        cached = CachedImage(np.asarray(image), side / max(image.size))
+
+        with self._lock:
+            self._images[url] = cached
+            while len(self._images) > self.max_items:
+                self._images.popitem(last=False)
+        return cached
+
+    def prefetch(self, urls, max_workers=8):
+        """
+        Loads every image of `urls` concurrently. A failed download is left to the later
+        `get`, which raises it where the image is needed.
+        """
+        def load(url):
+            try:
+                self.get(url)
+            except OSError:
+                pass
+
+        urls = [url for url in dict.fromkeys(urls) if isinstance(url, str) and url]
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            list(pool.map(load, urls))
+
+
+@functools.lru_cache(maxsize=None)
+def get_image_cache() -> ImageCache:
+    # Una sola cache per processo, creata al primo uso
+    return ImageCache()
+
+
+def _font_file(url, fonts_dir):
+    """Local path of the font at `url`: bundled, cached, or downloaded once into `fonts_dir`."""
+    filename = url.rsplit("/", 1)[-1]
+    for directory in (BUNDLED_FONTS_DIR, fonts_dir):
+        if (directory / filename).exists():
+            return directory / filename
+
+    fonts_dir.mkdir(parents=True, exist_ok=True)
+    with urlopen(url, timeout=10) as response:
+        _write_atomic(fonts_dir / filename, response.read())
+    return fonts_dir / filename
+
+
+@functools.lru_cache(maxsize=None)
+def get_font(font_name='Relaway', font_weight='regular'):
+    """
+    FontProperties of a font of `fonts_dictionary`, loaded once per process.
+
+    The TTF comes from BUNDLED_FONTS_DIR or from the local cache (ASSETS_DIR / "fonts");
+    it is downloaded only the first time. Without network, the default sans-serif font
+    (with the same weight) is used instead.
+    """
+    from matplotlib.font_manager import FontProperties
+
+    try:
+        return FontProperties(fname=_font_file(fonts_dictionary[font_name][font_weight], ASSETS_DIR / "fonts"))
+    except OSError:
+        return FontProperties(family="sans-serif", weight="bold" if "bold" in font_weight else "normal")
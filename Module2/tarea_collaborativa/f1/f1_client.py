@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from common.rate_limiter import TokenBucket, rate_limited_get
+
+
+API_BASE = "https://v1.formula-1.api-sports.io"
+
+
+class F1Client:
+    """
+    Streamlit-free API-Formula-1 client. The API key is injected by the caller
+    (Streamlit secrets in the app, environment variables in scripts).
+
+    Every request goes through a token bucket that follows the quota reported by the
+    API headers and retries after rate-limit errors.
+
+    Args:
+        api_key: API-Formula-1 key.
+        requests_per_minute: quota of the subscription plan (10 on the free plan).
+    """
+
+    def __init__(self, api_key, requests_per_minute=10, session=None):
+        self.session = session or requests.Session()
+        self.session.headers.update({
+            "x-apisports-key": api_key,
+            "x-rapidapi-host": "v1.formula-1.api-sports.io"
+        })
+        self.limiter = TokenBucket.per_minute(requests_per_minute)
+
+    def get(self, endpoint, params=None, debug=False):
+        payload = rate_limited_get(self.session, self.limiter, f"{API_BASE}/{endpoint}", params=params)
+        if debug:
+            print(payload)
+        return payload.get("response", [])
+
+    def get_races(self, season, type="Race"):
+        return self.get("races", {"season": season, "type": type})
+
+    def get_rankings_drivers(self, season):
+        return self.get("rankings/drivers", {"season": season})
+
+    def get_rankings_teams(self, season):
+        return self.get("rankings/teams", {"season": season})
+
+    def get_fastest_laps(self, race_id):
+        return self.get("rankings/fastestlaps", {"race": race_id})
+
+    def iter_fastest_laps(self, race_ids, max_workers=None):
+        """
+        Fetches the fastest laps of many races concurrently (up to the bucket capacity)
+        and yields `(race_id, laps, error)` as each race arrives.
+        """
+        race_ids = list(race_ids)
+        if not race_ids:
+            return
+        with ThreadPoolExecutor(max_workers=max_workers or self.limiter.capacity) as pool:
+            futures = {pool.submit(self.get_fastest_laps, race_id): race_id for race_id in race_ids}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except requests.exceptions.RequestException as e:
+                    yield futures[future], None, e
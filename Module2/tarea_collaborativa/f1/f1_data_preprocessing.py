@@ -1,48 +1,286 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
 import pandas as pd
-from api_f1_call import get_super_times_by_season
+
+from f1_store import LAP_COLUMNS, laps_frame
+
+
+# Colonne di pilota / team usate come entity_name e image_url
+SUPER_TIME_ENTITY_COLUMNS = {
+    "driver": {"driver.name": "entity_name", "driver.image": "image_url"},
+    "team": {"team.name": "entity_name", "team.logo": "image_url"},
+}
+
+
+# [+][[H:]M:]S[.mmm]: tempi sul giro, gap, tempi di gara e durate dei pit stop
+TIMING_PATTERN = r"^\+?(?:(?:(?P<hours>\d+):)?(?P<minutes>\d+):)?(?P<seconds>\d+)(?:\.(?P<fraction>\d+))?$"
 
 
-def build_super_time_dataframe(races: pd.DataFrame, super_times: dict, by: str = "driver"):
+def timing_to_ms(values) -> pd.Series:
     """
-    Crea un DataFrame completo per visualizzazione scatter-line.
-    
+    Converte un'intera colonna di tempi in millisecondi interi, senza ciclare sulle righe.
+
+    Formati accettati: "1:23.456" (M:SS.mmm), "1:32:10.123" (H:MM:SS.mmm), "23.456",
+    "+5.123" (gap). Valori mancanti o non temporali ("+1 lap", "DNF") diventano <NA>.
+
+    Returns:
+        pd.Series Int64 (stesso indice di `values` se e' una Series)
+    """
+    values = pd.Series(values).astype("string").str.strip()
+    parts = values.str.extract(TIMING_PATTERN)
+    hours = pd.to_numeric(parts["hours"]).fillna(0)
+    minutes = pd.to_numeric(parts["minutes"]).fillna(0)
+    seconds = pd.to_numeric(parts["seconds"])
+    # Decimi / centesimi / millesimi: le prime tre cifre, completate con zeri
+    fraction = pd.to_numeric(parts["fraction"].str[:3].str.ljust(3, "0")).fillna(0)
+    ms = ((hours * 60 + minutes) * 60 + seconds) * 1000 + fraction
+    return ms.astype("Int64")
+
+
+# ---- Fetch: tabelle per stagione, dall'API o dal warehouse locale ----
+
+# Endpoint per stagione -> metodo di F1Client
+SEASON_ENDPOINTS = {
+    "races": "get_races",
+    "rankings/drivers": "get_rankings_drivers",
+    "rankings/teams": "get_rankings_teams",
+}
+
+
+def fetch_seasons(client, store=None):
+    """
+    Stagioni disponibili. Con uno `store` la lista viene salvata, e senza rete (o con la
+    quota esaurita) si usa quella salvata.
+    """
+    try:
+        seasons = client.get("seasons")
+    except OSError:
+        if store is None or not store.load_seasons():
+            raise
+        return store.load_seasons()
+    if store is not None:
+        store.save_seasons(seasons)
+    return seasons
+
+
+def fetch_season_table(client, endpoint: str, season: int, store=None):
+    """
+    Risposta di `endpoint` (una chiave di SEASON_ENDPOINTS) per una stagione.
+
+    Con uno `store` (F1Store) una tabella salvata a stagione gia' conclusa viene letta dal
+    disco, senza richieste; le altre (anche quelle salvate a stagione in corso) si
+    scaricano e si salvano. Se la richiesta fallisce (niente
+    rete, quota esaurita) si usa l'ultima copia salvata, se c'e'.
+    """
+    if store is not None and store.has_season(endpoint, season, final=True):
+        return store.load_season(endpoint, season)
+    try:
+        rows = getattr(client, SEASON_ENDPOINTS[endpoint])(season)
+    except OSError:
+        if store is None or not store.has_season(endpoint, season):
+            raise
+        return store.load_season(endpoint, season)
+    if store is not None:
+        store.save_season(endpoint, season, rows)
+    return rows
+
+
+# ---- Fetch: giri veloci grezzi, una riga per (gara, pilota) ----
+
+FASTEST_LAP_COLUMNS = ["race_id", *LAP_COLUMNS]
+
+
+def iter_fastest_laps(client, season: int, store=None):
+    """
+    Scarica i giri veloci di tutte le gare di una stagione, man mano che arrivano.
+
+    Le richieste dei giri veloci partono in parallelo, limitate dal token bucket del client
+    (niente attese fisse tra una gara e l'altra).
+
+    Con uno `store` (F1Store) le gare gia' concluse e salvate vengono lette dal disco e si
+    scaricano solo quelle mancanti o non ancora concluse; per una stagione passata gia'
+    completa non parte nessuna richiesta. Se una richiesta fallisce si usano i giri
+    salvati di quella gara, se ci sono.
+
     Args:
+        client: F1Client usato per le richieste
         season: stagione selezionata
+        store: F1Store opzionale
+
+    Yields:
+        (races, laps, done) dopo ogni gara ricevuta:
+        - races (DataFrame con le gare)
+        - laps (DataFrame lungo: race_id + colonne di `laps_frame`, in ordine di calendario)
+        - done (numero di gare ricevute, su len(races))
+    """
+    races_raw = fetch_season_table(client, "races", season, store=store)
+    races = pd.json_normalize(races_raw)
+    frames = []
+    if races.empty:
+        yield races, pd.DataFrame(columns=FASTEST_LAP_COLUMNS), 0
+        return
+
+    race_status = dict(zip(races["id"], races["status"]))
+    calendar = {race_id: i for i, race_id in enumerate(races["id"])}
+
+    def calendar_laps():
+        # Le gare arrivano in ordine sparso: si restituiscono in ordine di calendario
+        if not frames:
+            return pd.DataFrame(columns=FASTEST_LAP_COLUMNS)
+        laps = pd.concat(frames, ignore_index=True)[FASTEST_LAP_COLUMNS]
+        order = np.argsort(laps["race_id"].map(calendar).to_numpy(), kind="stable")
+        return laps.iloc[order].reset_index(drop=True)
+
+    stored = store.final_race_ids(races["id"]) if store is not None else set()
+    if stored:
+        frames.append(store.load_laps(stored))
+        yield races, calendar_laps(), len(stored)
+
+    missing = [race_id for race_id in races["id"] if race_id not in stored]
+    for done, (race_id, best_laps, error) in enumerate(client.iter_fastest_laps(missing), start=len(stored) + 1):
+        if error is not None:
+            saved_laps = store.load_laps([race_id]) if store is not None else pd.DataFrame()
+            if saved_laps.empty:
+                print(f"Errore nella richiesta per race {race_id}: {error}")
+            else:
+                frames.append(saved_laps)
+        else:
+            best_laps_df = laps_frame(best_laps)
+            if store is not None:
+                store.save_laps(race_id, best_laps_df, race_status[race_id])
+            if not best_laps_df.empty:
+                frames.append(best_laps_df.assign(race_id=race_id))
+        yield races, calendar_laps(), done
+
+
+def fetch_fastest_laps(client, season: int, store=None):
+    """
+    Restituisce:
+        - races (DataFrame con le gare)
+        - laps (DataFrame lungo con i giri veloci di tutte le gare)
+    """
+    races, laps = pd.DataFrame(), pd.DataFrame()
+    for races, laps, _ in iter_fastest_laps(client, season, store=store):
+        pass
+    return races, laps
+
+
+def iter_seasons_fastest_laps(client, seasons, store=None, max_workers=4):
+    """
+    Scarica i giri veloci di piu' stagioni in parallelo. Tutte le richieste passano dal
+    token bucket del client, quindi il limite di richieste resta unico; le stagioni gia'
+    complete nello `store` non fanno richieste.
+
+    Yields:
+        (season, races, laps) man mano che ogni stagione e' completa
+    """
+    seasons = list(seasons)
+    if not seasons:
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(seasons))) as pool:
+        futures = {pool.submit(fetch_fastest_laps, client, season, store): season for season in seasons}
+        for future in as_completed(futures):
+            races, laps = future.result()
+            yield futures[future], races, laps
+
+
+# ---- Compute: Super Time su tutta la tabella in un solo passaggio ----
+
+SUPER_TIME_COLUMNS = [
+    "race_id", "race_index", "race_name",
+    *[column for columns in SUPER_TIME_ENTITY_COLUMNS.values() for column in columns],
+    "time", "time_ms", "superTimeRatio", "superTimeDelta", "superTimeDelta%",
+]
+
+
+def compute_super_times(races: pd.DataFrame, laps: pd.DataFrame) -> pd.DataFrame:
+    """
+    Super Time di tutti i giri veloci in un'unica tabella, una riga per (gara, pilota).
+
+    Il giro di riferimento di ogni gara e' `groupby('race_id').transform('min')`, quindi
+    una o piu' stagioni si calcolano con le stesse operazioni di colonna. Pilota e team
+    restano affiancati: passare da "driver" a "team" e' una selezione di colonne.
+
+    Args:
+        races: gare (colonne id, competition.name; con piu' stagioni anche season)
+        laps: giri veloci (race_id + colonne di `laps_frame`)
+
+    Returns:
+        pd.DataFrame con colonne SUPER_TIME_COLUMNS (piu' season se presente in races),
+        race_index = posizione in calendario tra le gare con tempi, per stagione
+    """
+    multi_season = "season" in races
+    columns = (["season"] if multi_season else []) + SUPER_TIME_COLUMNS
+    laps = laps.dropna(subset=["time"])
+    if laps.empty:
+        return pd.DataFrame(columns=columns)
+
+    # Gare con almeno un tempo, in ordine di calendario
+    calendar = races[races["id"].isin(laps["race_id"])].reset_index(drop=True)
+    if multi_season:
+        race_index = calendar.groupby("season").cumcount() + 1
+    else:
+        race_index = pd.Series(np.arange(1, len(calendar) + 1), index=calendar.index)
+    race_position = pd.Series(calendar.index, index=calendar["id"])
+
+    super_times = laps.reset_index(drop=True)
+    position = super_times["race_id"].map(race_position).to_numpy()
+    super_times["race_index"] = race_index.to_numpy(dtype=np.int16)[position]
+    super_times["race_name"] = pd.Categorical(calendar["competition.name"].to_numpy(dtype=object)[position])
+    if multi_season:
+        super_times["season"] = calendar["season"].to_numpy(dtype=np.int16)[position]
+
+    time_ms = timing_to_ms(super_times["time"])
+    ratio = (time_ms / time_ms.groupby(super_times["race_id"]).transform("min")).astype("float32")
+    super_times["time_ms"] = time_ms
+    super_times["superTimeRatio"] = ratio
+    super_times["superTimeDelta"] = ratio - 1
+    super_times["superTimeDelta%"] = ((ratio - 1) * 100).round(2)
+
+    entity_columns = [column for columns in SUPER_TIME_ENTITY_COLUMNS.values() for column in columns]
+    super_times = super_times.astype({**{column: "category" for column in entity_columns}, "time": "string"})
+    return super_times.iloc[np.argsort(position, kind="stable")][columns].reset_index(drop=True)
+
+
+def compute_multi_season_super_times(seasons_laps: dict) -> pd.DataFrame:
+    """
+    `compute_super_times` di piu' stagioni in un solo passaggio, con la colonna season.
+
+    Args:
+        seasons_laps: dict season -> (races, laps)
+    """
+    seasons = sorted(seasons_laps)
+    races = pd.concat([seasons_laps[season][0].assign(season=season) for season in seasons
+                       if not seasons_laps[season][0].empty], ignore_index=True)
+    laps = pd.concat([seasons_laps[season][1] for season in seasons], ignore_index=True)
+    if races.empty:
+        return pd.DataFrame(columns=["season", *SUPER_TIME_COLUMNS])
+    return compute_super_times(races, laps)
+
+
+def select_super_time_entity(super_times: pd.DataFrame, by: str = "driver") -> pd.DataFrame:
+    """
+    Vista per pilota o per team di `compute_super_times`: solo selezione e rinomina di colonne.
+    """
+    assert by in ["driver", "team"], "Valore 'by' deve essere 'driver' o 'team'"
+    entity_columns = SUPER_TIME_ENTITY_COLUMNS[by]
+    leading = ["season"] if "season" in super_times else []
+    return super_times[[*leading, "race_index", "race_name", *entity_columns, "time", "time_ms", "superTimeRatio", "superTimeDelta%"]] \
+        .rename(columns=entity_columns)
+
+
+def build_super_time_dataframe(races: pd.DataFrame, laps: pd.DataFrame, by: str = "driver"):
+    """
+    Crea un DataFrame completo per visualizzazione scatter-line.
+
+    Args:
+        races: gare della stagione
+        laps: giri veloci (vedi `iter_fastest_laps`)
         by: "driver" o "team"
 
     Returns:
         pd.DataFrame con colonne standardizzate:
             race_index, race_name, entity_name, image_url, time, time_ms, superTimeRatio, superTimeDelta%
     """
-    assert by in ["driver", "team"], "Valore 'by' deve essere 'driver' o 'team'"
-
-    
-    all_rows = []
-    
-    # Ottieni i dati delle gare per associare i nomi
-    race_name_map = dict(zip(races["id"], races["competition.name"]))
-    
-    for race_index, (race_id, data) in enumerate(super_times.items(), start=1):
-        df = data["data"]
-        race_name = race_name_map.get(race_id, f"GP {race_index}")
-        
-        for _, row in df.iterrows():
-            if by == "driver":
-                name = row["driver.name"]
-                image = row["driver.image"]
-            else:
-                name = row["team.name"]
-                image = row["team.logo"]
-
-            all_rows.append({
-                "race_index": race_index,
-                "race_name": race_name,
-                "entity_name": name,
-                "image_url": image,
-                "time": row["time"],
-                "time_ms": row["time_ms"],
-                "superTimeRatio": row["superTimeRatio"],
-                "superTimeDelta%": row["superTimeDelta%"],
-            })
-
-    return pd.DataFrame(all_rows)
+    return select_super_time_entity(compute_super_times(races, laps), by)
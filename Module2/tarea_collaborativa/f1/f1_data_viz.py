@@ -1,50 +1,22 @@
+import functools
 
 #Data manipulation libraries
-from matplotlib.offsetbox import AnnotationBbox, OffsetImage
-from mplsoccer import FontManager
-from PIL import Image
-
-import matplotlib.pyplot as plt
-from matplotlib.patches import Rectangle
-from highlight_text import ax_text
-import plotly.graph_objects as go 
+import numpy as np
 import pandas as pd
-import streamlit as st
 
+from f1_assets import get_font, get_image_cache
 
-from urllib.request import urlopen
-
-fonts_dictionary = {
-    'Relaway':{ # per cercare altri font Relaway -> https://github.com/cyrealtype/Raleway/raw/master/fonts/ttf/
-        'bold':'https://github.com/cyrealtype/Raleway/raw/master/fonts/ttf/Raleway-Bold.ttf',
-        'regular': 'https://github.com/cyrealtype/Raleway/raw/master/fonts/ttf/Raleway-Regular.ttf',
-        'italic' : 'https://github.com/cyrealtype/Raleway/raw/master/fonts/ttf/Raleway-Italic.ttf',
-        'medium' : 'https://github.com/cyrealtype/Raleway/raw/master/fonts/ttf/Raleway-Medium.ttf',
-        'bold_italic': 'https://github.com/cyrealtype/Raleway/raw/master/fonts/ttf/Raleway-BoldItalic.ttf',
-        'semibold': 'https://github.com/cyrealtype/Raleway/raw/master/fonts/ttf/Raleway-SemiBold.ttf'
-    }
-}
+# matplotlib, highlight_text, PIL e plotly vengono importati dentro le
+# funzioni che li usano: importare questo modulo non carica lo stack grafico
 
 COLORS = {
     'oro_sd' : '#C7BE87',
     'grigio_sd' : '#71777f'
 }
 
-#Get Font Manager
-def get_font_manager(font_name='Relaway', font_weight='regular'):
-    """
-    Ottiene il gestore del font per un font e un peso specificati.
-
-    Args:
-    - font_name (str, opzionale): Nome del font.
-    - font_weight (str, opzionale): Peso del font.
-
-    Returns:
-    - FontManager: Oggetto gestore del font per il font e il peso specificati.
-    """
-    return FontManager(fonts_dictionary[font_name][font_weight])
-
-def add_text_to_fig(fig, text, x, y,  color=COLORS['grigio_sd'], ha='center', va='center', fontproperties=get_font_manager().prop, size=9):
+def add_text_to_fig(fig, text, x, y,  color=COLORS['grigio_sd'], ha='center', va='center', fontproperties=None, size=9):
+    if fontproperties is None:
+        fontproperties = get_font()
     ax = fig.gca()
     ax.text(
         x, y,
@@ -61,8 +33,10 @@ def add_image_to_fig(fig, img_url,
                      
                      x, y, width=0.5, 
                      height=0.5, background=False, xycoords='axes fraction'):
+    from matplotlib.offsetbox import AnnotationBbox, OffsetImage
 
-    image = Image.open(urlopen(img_url)).convert('RGBA')
+    # Dalla cache delle immagini: in memoria gia' decodificata, altrimenti dal disco
+    image, scale = get_image_cache().get(img_url)
     
     if background:
         # Add the image as a background for the entire figure
@@ -72,11 +46,45 @@ def add_image_to_fig(fig, img_url,
     else:
         # Add the image as an overlay at the given (x, y) position
         ax = fig.gca()
-        imagebox = OffsetImage(image, zoom=width)  # Zoom determines size based on original resolution
+        imagebox = OffsetImage(image, zoom=width * scale)  # Zoom determines size based on original resolution
         ab = AnnotationBbox(imagebox, (x, y), frameon=False, xycoords=xycoords)
         ax.add_artist(ab)
     return fig
 
+@functools.lru_cache(maxsize=4096)
+def _text_width(text, fontproperties, size):
+    """Width in points of `text` drawn with `fontproperties` at `size`, without a renderer."""
+    from matplotlib.textpath import TextToPath
+
+    prop = fontproperties.copy()
+    prop.set_size(size)
+    width, _, _ = TextToPath().get_text_width_height_descent(text, prop, ismath=False)
+    return width
+
+
+def _image_grid(images, zooms, cell_size, dpi):
+    """
+    One RGBA array with `images` (rows x columns of CachedImage or None) laid out in cells
+    of `cell_size` display pixels, each image as large as OffsetImage(zoom) would draw it
+    (shrunk to fit its cell) and centered in it.
+    """
+    from PIL import Image
+
+    cell_w, cell_h = max(1, round(cell_size[0])), max(1, round(cell_size[1]))
+    grid = Image.new("RGBA", (cell_w * len(zooms), cell_h * len(images)))
+    for i, row in enumerate(images):
+        for j, (cached, zoom) in enumerate(zip(row, zooms)):
+            if cached is None:
+                continue
+            height, width = cached.pixels.shape[:2]
+            factor = zoom * cached.scale * dpi / 72
+            factor *= min(1, cell_w / (width * factor), cell_h / (height * factor))
+            size = (max(1, round(width * factor)), max(1, round(height * factor)))
+            image = Image.fromarray(cached.pixels).resize(size, Image.LANCZOS)
+            grid.alpha_composite(image, (j * cell_w + (cell_w - size[0]) // 2, i * cell_h + (cell_h - size[1]) // 2))
+    return np.asarray(grid)
+
+
 def create_top10_table_image_f1(
     table_df,
     metric_name="points",
@@ -89,129 +97,74 @@ def create_top10_table_image_f1(
     team_logo_column=None,
     img_width=0.35
 ):
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Rectangle
+    from highlight_text import ax_text
+
+    # Tutte le immagini della tabella scaricate in parallelo prima di disegnare
+    image_columns = [image_column] + ([team_logo_column] if team_logo_column in table_df else [])
+    zooms = [img_width, 0.3][:len(image_columns)]
+    cache = get_image_cache()
+    cache.prefetch(table_df[image_columns].to_numpy().ravel().tolist())
+
+    records = table_df.to_dict("records")
+    n = len(records)
+    font_prop = get_font(font_name="Relaway", font_weight="regular")
+    font_prop_bold = get_font(font_name="Relaway", font_weight="bold")
+
+    # Larghezza dei nomi dalle metriche del font: la colonna dei valori e' nota prima di disegnare
+    widths = [_text_width(str(record[name_column]), font_prop_bold, 16) for record in records]
+    if team_column in table_df:
+        widths += [_text_width(str(record[team_column]), font_prop, 12) for record in records]
+    max_width_data = max(widths, default=0) / 72 * 2.54
+    value_x = int(3 + max_width_data)
+    xmin, xmax = (-0.5, value_x + 1)
+
     fig, ax = plt.subplots(figsize=(7, 12))
     ax.axis("off")
-    renderer = ax.figure.canvas.get_renderer()
-    font_prop = get_font_manager(font_name="Relaway", font_weight="regular").prop
-    font_prop_bold = get_font_manager(font_name="Relaway", font_weight="bold").prop
 
-    widths = []
-    for i, (_, record) in enumerate(table_df.iterrows()):
-        y_pos = len(table_df) - i
+    # Linea iniziale
+    ax.plot([xmin, xmax], [n + 1 - 0.5, n + 1 - 0.5], color=COLORS["oro_sd"])
+
+    images = []
+    for i, record in enumerate(records):
+        y_pos = n - i
 
         # Rank
-        ax.text(
-            x=0.1,
-            y=y_pos,
-            s=f"{record['rank']}°",
-            ha="center",
-            va="center",
-            fontproperties=font_prop_bold,
-            size=14,
-            color=COLORS["grigio_sd"],
-        )
-
-        # Main image (driver/team)
-        add_image_to_fig(
-            fig=fig,
-            img_url=record[image_column],
-            x=1,
-            y=y_pos,
-            xycoords="data",
-            width=img_width,
-        )
-
-        # Optional team logo
-        if team_logo_column and pd.notna(record.get(team_logo_column)):
-            add_image_to_fig(
-                fig=fig,
-                img_url=record[team_logo_column],
-                x=2,
-                y=y_pos,
-                xycoords="data",
-                width=0.3,
-            )
+        ax.text(x=0.1, y=y_pos, s=f"{record['rank']}°", ha="center", va="center",
+                fontproperties=font_prop_bold, size=14, color=COLORS["grigio_sd"])
+
+        # Immagini (pilota/team e logo opzionale): disegnate dopo, in un solo livello
+        images.append([cache.get(record[column]) if isinstance(record[column], str) else None
+                       for column in image_columns])
 
         # Name
-        name_text = ax.text(
-            x=3,
-            y=y_pos + 0.1,
-            s=record[name_column],
-            ha="left",
-            va="center",
-            fontproperties=font_prop_bold,
-            size=16,
-            color=COLORS["oro_sd"],
-        )
-        widths.append(name_text.get_window_extent(renderer=renderer).width)
+        ax.text(x=3, y=y_pos + 0.1, s=record[name_column], ha="left", va="center",
+                fontproperties=font_prop_bold, size=16, color=COLORS["oro_sd"])
 
         # Team name (if available)
         if team_column in record:
-            team_text = ax.text(
-                x=3,
-                y=y_pos - 0.1,
-                s=record[team_column],
-                ha="left",
-                va="top",
-                fontproperties=font_prop,
-                size=12,
-                color=COLORS["grigio_sd"],
-            )
-            widths.append(team_text.get_window_extent(renderer=renderer).width)
-
-    max_width_data = max(widths) / ax.figure.dpi * 2.54
-    value_x = int(3 + max_width_data)
-    xmin, xmax = (-0.5, value_x + 1)
+            ax.text(x=3, y=y_pos - 0.1, s=record[team_column], ha="left", va="top",
+                    fontproperties=font_prop, size=12, color=COLORS["grigio_sd"])
 
-    # Linea iniziale
-    ax.plot(
-        [-0.5, value_x + 1],
-        [len(table_df) + 1 - 0.5, len(table_df) + 1 - 0.5],
-        color=COLORS["oro_sd"],
-    )
-
-    for i, (_, record) in enumerate(table_df.iterrows()):
-        y_pos = len(table_df) - i
         val = record[metric_name] if isinstance(record[metric_name], int) else round(record[metric_name], 2)
-
-        ax.text(
-            x=value_x,
-            y=y_pos,
-            s=val,
-            ha="left",
-            va="center",
-            fontproperties=font_prop_bold,
-            size=15,
-            color=COLORS["grigio_sd"],
-        )
+        ax.text(x=value_x, y=y_pos, s=val, ha="left", va="center",
+                fontproperties=font_prop_bold, size=15, color=COLORS["grigio_sd"])
 
         # Background color
         is_selected = selected_id is not None and record.get(id_column) == selected_id
         patch_color = COLORS["oro_sd"] if is_selected else ("white" if i % 2 == 0 else "lightgray")
+        ax.add_patch(Rectangle(xy=(-0.5, y_pos - 0.5), width=value_x + 1.5, height=1,
+                               zorder=-1, color=patch_color, alpha=0.2))
 
-        ax.add_patch(
-            Rectangle(
-                xy=(-0.5, y_pos - 0.5),
-                width=value_x + 1.5,
-                height=1,
-                zorder=-1,
-                color=patch_color,
-                alpha=0.2,
-            )
-        )
-
-        ax.plot(
-            [xmin, xmax],
-            [y_pos - 0.5, y_pos - 0.5],
-            color=COLORS["oro_sd"],
-        )
-
-    ax.set_ylim(top=len(table_df) + 1)
+        ax.plot([xmin, xmax], [y_pos - 0.5, y_pos - 0.5], color=COLORS["oro_sd"])
+
+    ax.set_ylim(top=n + 1)
     ax.set_xlim((xmin, xmax))
 
     ax_text(
         x=(xmax + xmin) / 2,
-        y=len(table_df) + 1,
+        y=n + 1,
         s=f"<Top 10 {metric_visible_name}>",
         color="black",
         highlight_textprops=[
@@ -225,36 +178,78 @@ def create_top10_table_image_f1(
     )
 
     plt.tight_layout()
+
+    # Le immagini, una cella di 1 x 1 unita' per riga e colonna (centrate in x = 1, 2),
+    # composte in un'unica immagine a risoluzione di schermo
+    if n:
+        ylim, bbox = ax.get_ylim(), ax.get_window_extent()
+        cell_size = (bbox.width / (xmax - xmin), bbox.height / (ylim[1] - ylim[0]))
+        ax.imshow(_image_grid(images, zooms, cell_size, fig.dpi),
+                  extent=(0.5, 0.5 + len(image_columns), 0.5, n + 0.5), aspect="auto", interpolation="none")
+        ax.set_xlim((xmin, xmax))
+        ax.set_ylim(ylim)
     return fig
 
+
+def figure_to_png(fig) -> bytes:
+    """Renders a matplotlib figure to PNG bytes and closes it."""
+    import matplotlib.pyplot as plt
+    from io import BytesIO
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png")
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+# Oltre queste soglie il grafico dei Super Time usa tracce WebGL (Scattergl)
+WEBGL_MIN_TRACES = 25
+WEBGL_MIN_POINTS = 2000
+
+SUPER_TIME_HOVER = (
+    "<b>%{fullData.name}</b><br>"
+    "<b>GP:</b> %{customdata[0]}<br>"
+    "<b>Best Lap:</b> %{customdata[1]}<br>"
+    "<b>Delta%:</b> %{customdata[2]:.2f}%"
+    "<extra></extra>"
+)
+SUPER_TIME_FORM_HOVER = SUPER_TIME_HOVER.replace(
+    "<extra>", "<br><b>Form (last 3 GP):</b> %{customdata[3]:.2%}<extra>")
+
+
 def plot_super_time(df: pd.DataFrame, by: str = "driver"):
     """
     Crea il grafico scatter-line per Super Time.
+
+    I tooltip arrivano come array (customdata) con un solo hovertemplate; con molte
+    entita' o molti punti le tracce diventano Scattergl. Se df ha la colonna form
+    (vedi `SuperTimeMatrix.frame`) anche la forma recente compare nel tooltip.
     """
+    import plotly.graph_objects as go
+
     fig = go.Figure()
 
-    if by == "team":
-        # Prendi il giro più veloce per ciascun team e GP
-        indexes = df.sort_values("time_ms").drop_duplicates(subset=["entity_name", "race_index"], keep="first").sort_index().index
+    if by == "team" and "form" not in df:
+        # Prendi il giro più veloce per ciascun team e GP (SuperTimeMatrix.frame li ha gia' ridotti)
+        df = df.dropna(subset=["time_ms"])
+        df = df.loc[df.groupby(["entity_name", "race_index"], observed=True)["time_ms"].idxmin()].sort_index()
 
-        df = df.loc[indexes]
-    
-    for name, group in df.groupby("entity_name"):
+    hover_columns = ["superTimeDelta%"] + (["form"] if "form" in df else [])
+    groups = df.groupby("entity_name", observed=True)
+    scatter = go.Scattergl if groups.ngroups >= WEBGL_MIN_TRACES or len(df) >= WEBGL_MIN_POINTS else go.Scatter
 
-        fig.add_trace(go.Scatter(
+    for name, group in groups:
+        fig.add_trace(scatter(
             x=group["race_index"],
             y=(group["superTimeRatio"] * 100),  # da 100%
             mode="lines+markers",
             name=name,
-            text=[  # Tooltip personalizzato
-                f"""
-                <b>{row["entity_name"]}</b><br>
-                <b>GP:</b> {row['race_name']}<br>
-                <b>Best Lap:</b> {row['time']}<br>
-                <b>Delta%:</b> {row['superTimeDelta%']}%
-                """ for _, row in group.iterrows()
-            ],
-            hoverinfo="text"
+            customdata=np.column_stack([
+                group["race_name"].astype(str),
+                group["time"].astype(str),
+                group[hover_columns].to_numpy(dtype=float),
+            ]),
+            hovertemplate=SUPER_TIME_FORM_HOVER if "form" in df else SUPER_TIME_HOVER,
         ))
 
     fig.update_layout(
@@ -267,4 +262,45 @@ def plot_super_time(df: pd.DataFrame, by: str = "driver"):
         height=600
     )
     
-    return fig
\ No newline at end of file
+    return fig
+
+SUPER_TIME_TREND_HOVER = (
+    "<b>%{fullData.name}</b><br>"
+    "<b>Season:</b> %{x}<br>"
+    "<b>Avg Super Time:</b> %{y:.2f}%<br>"
+    "<b>GP:</b> %{customdata[0]}"
+    "<extra></extra>"
+)
+
+
+def plot_super_time_trend(df: pd.DataFrame, by: str = "driver"):
+    """
+    Andamento del Super Time medio per stagione, da `SuperTimeMatrix.season_average`
+    (colonne season, entity_name, superTimeRatio, races).
+    """
+    import plotly.graph_objects as go
+
+    groups = df.groupby("entity_name", observed=True)
+    scatter = go.Scattergl if groups.ngroups >= WEBGL_MIN_TRACES or len(df) >= WEBGL_MIN_POINTS else go.Scatter
+
+    fig = go.Figure()
+    for name, group in groups:
+        fig.add_trace(scatter(
+            x=group["season"],
+            y=group["superTimeRatio"] * 100,
+            mode="lines+markers",
+            name=name,
+            customdata=group[["races"]].to_numpy(),
+            hovertemplate=SUPER_TIME_TREND_HOVER,
+        ))
+
+    fig.update_layout(
+        title=f"Average Super Time by Season - {'Drivers' if by == 'driver' else 'Teams'}",
+        xaxis_title="Season",
+        yaxis_title="Average Super Time % (100 = best)",
+        xaxis=dict(dtick=1),
+        hovermode="closest",
+        template="plotly_white",
+        height=600
+    )
+    return fig
@@ -0,0 +1,54 @@
+"""
+Ingest job for the local F1 warehouse.
+
+Mirrors the API-Formula-1 endpoints used by the app (seasons, races, driver and team
+rankings, and the fastest laps of every race) for the chosen seasons into the SQLite
+warehouse read by the app (f1/data/f1.sqlite by default). Past seasons already complete
+in the warehouse make no request, so a rerun only fetches what is missing or still
+changing. Once a season is ingested its pages work offline.
+
+Usage:
+    API_F1_KEY=... python f1_ingest.py --seasons 2021 2022 2023
+"""
+import argparse
+import os
+from pathlib import Path
+
+from f1_client import F1Client
+from f1_data_preprocessing import SEASON_ENDPOINTS, fetch_fastest_laps, fetch_season_table, fetch_seasons
+from f1_store import DEFAULT_PATH, F1Store
+
+
+def run(client, seasons, db_path=DEFAULT_PATH):
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    store = F1Store(db_path)
+
+    print(f"{len(fetch_seasons(client, store=store))} seasons available")
+    for season in seasons:
+        for endpoint in SEASON_ENDPOINTS:
+            rows = fetch_season_table(client, endpoint, season, store=store)
+            print(f"{season} {endpoint}: {len(rows)} rows")
+        races, laps = fetch_fastest_laps(client, season, store=store)
+        print(f"{season} rankings/fastestlaps: {len(laps)} laps in {len(races)} races")
+    print(f"Warehouse written to {db_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seasons", type=int, nargs="+", required=True, help="season years, e.g. 2022 2023")
+    parser.add_argument("--db", default=DEFAULT_PATH, help="path of the SQLite warehouse")
+    parser.add_argument("--requests-per-minute", type=int, default=10, help="API quota of the plan")
+    parser.add_argument("--api-key", default=os.environ.get("API_F1_KEY"),
+                        help="API-Formula-1 key (default: $API_F1_KEY)")
+    args = parser.parse_args()
+
+    if not args.api_key:
+        parser.error("an API key is required (--api-key or $API_F1_KEY)")
+
+    client = F1Client(args.api_key, requests_per_minute=args.requests_per_minute)
+    run(client, args.seasons, args.db)
+
+
+if __name__ == "__main__":
+    main()
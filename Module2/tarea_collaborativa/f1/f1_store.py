@@ -0,0 +1,258 @@
+import datetime
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+
+DEFAULT_PATH = Path(__file__).parent / "data" / "f1.sqlite"
+
+# Colonne di `rankings/fastestlaps` conservate (nomi di pd.json_normalize -> colonne SQL)
+LAP_COLUMNS = {
+    "driver.id": "driver_id",
+    "driver.name": "driver_name",
+    "driver.abbr": "driver_abbr",
+    "driver.number": "driver_number",
+    "driver.image": "driver_image",
+    "team.id": "team_id",
+    "team.name": "team_name",
+    "team.logo": "team_logo",
+    "position": "position",
+    "lap": "lap",
+    "time": "time",
+    "avg_speed": "avg_speed",
+}
+
+# Gare il cui risultato non cambia piu'
+FINAL_STATUSES = ("Completed", "Cancelled")
+
+# Endpoint per stagione salvati nel warehouse -> (tabella, entita' della classifica)
+SEASON_TABLES = {
+    "races": ("races", None),
+    "rankings/drivers": ("driver_rankings", "driver"),
+    "rankings/teams": ("team_rankings", "team"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seasons (
+    season INTEGER PRIMARY KEY
+);
+
+-- Endpoint per stagione salvati almeno una volta (anche se la risposta era vuota);
+-- final = 1 se la stagione era gia' conclusa quando la tabella e' stata salvata
+CREATE TABLE IF NOT EXISTS season_synced (
+    endpoint TEXT NOT NULL,
+    season INTEGER NOT NULL,
+    final INTEGER NOT NULL DEFAULT 0,
+    fetched_at TEXT NOT NULL,
+    PRIMARY KEY (endpoint, season)
+);
+
+CREATE TABLE IF NOT EXISTS races (
+    race_id INTEGER PRIMARY KEY,
+    season INTEGER NOT NULL,
+    date TEXT,
+    status TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS races_season ON races (season);
+
+CREATE TABLE IF NOT EXISTS fastest_laps_synced (
+    race_id INTEGER PRIMARY KEY,
+    status TEXT,
+    fetched_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS fastest_laps (
+    race_id INTEGER NOT NULL,
+    driver_id INTEGER,
+    driver_name TEXT,
+    driver_abbr TEXT,
+    driver_number INTEGER,
+    driver_image TEXT,
+    team_id INTEGER,
+    team_name TEXT,
+    team_logo TEXT,
+    position INTEGER,
+    lap INTEGER,
+    time TEXT,
+    avg_speed TEXT,
+    PRIMARY KEY (race_id, driver_id)
+);
+CREATE INDEX IF NOT EXISTS fastest_laps_driver ON fastest_laps (driver_id);
+CREATE INDEX IF NOT EXISTS fastest_laps_team ON fastest_laps (team_id);
+
+CREATE TABLE IF NOT EXISTS driver_rankings (
+    season INTEGER NOT NULL,
+    driver_id INTEGER NOT NULL,
+    team_id INTEGER,
+    position INTEGER,
+    points REAL,
+    payload TEXT NOT NULL,
+    -- Un pilota che cambia team a stagione in corso compare una volta per team
+    PRIMARY KEY (season, driver_id, team_id)
+);
+CREATE INDEX IF NOT EXISTS driver_rankings_position ON driver_rankings (season, position);
+
+CREATE TABLE IF NOT EXISTS team_rankings (
+    season INTEGER NOT NULL,
+    team_id INTEGER NOT NULL,
+    position INTEGER,
+    points REAL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (season, team_id)
+);
+CREATE INDEX IF NOT EXISTS team_rankings_position ON team_rankings (season, position);
+"""
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+def _season_is_past(season):
+    return season < datetime.date.today().year
+
+
+def laps_frame(best_laps) -> pd.DataFrame:
+    """Normalizes a `rankings/fastestlaps` response keeping only LAP_COLUMNS."""
+    df = pd.json_normalize(best_laps)
+    return df.reindex(columns=list(LAP_COLUMNS))
+
+
+class F1Store:
+    """
+    Local SQLite warehouse of the API-Formula-1 data used by the app: seasons, race
+    calendars, driver and team rankings and the per-race fastest-lap tables.
+
+    A race whose laps were stored after it was completed is never fetched again, and a
+    season table stored once the season was over is served from disk from then on. Rows keep the
+    API payload (JSON) next to their keys, so a stored table is returned exactly as the
+    API returned it.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        # Una connessione condivisa dai thread di Streamlit, serializzata dal lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+            # Warehouse creati prima della colonna `final`: le tabelle salvate si riscaricano una volta
+            if "final" not in {row[1] for row in self._conn.execute("PRAGMA table_info(season_synced)")}:
+                self._conn.execute("ALTER TABLE season_synced ADD COLUMN final INTEGER NOT NULL DEFAULT 0")
+
+    def save_seasons(self, seasons):
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO seasons (season) VALUES (?)", [(int(s),) for s in seasons])
+
+    def load_seasons(self):
+        with self._lock:
+            return [season for season, in self._conn.execute("SELECT season FROM seasons ORDER BY season")]
+
+    def has_season(self, endpoint, season, final=False):
+        """
+        True if the `endpoint` table of `season` (a key of SEASON_TABLES) was stored; with
+        `final`, only if it was stored once the season was over (it will not change).
+        """
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM season_synced WHERE endpoint = ? AND season = ? AND final >= ?",
+                                      (endpoint, season, int(final))).fetchone() is not None
+
+    def save_season(self, endpoint, season, rows):
+        """
+        Replaces the stored `endpoint` table of `season` with the API response `rows`,
+        recording whether the season was already over (see `has_season`).
+        """
+        table, entity = SEASON_TABLES[endpoint]
+        if entity is None:
+            columns = ("race_id", "season", "date", "status", "payload")
+            values = [(r["id"], season, r.get("date"), r.get("status"), json.dumps(r)) for r in rows]
+            final = _season_is_past(season) and bool(rows) and all(r.get("status") in FINAL_STATUSES for r in rows)
+        else:
+            if entity == "driver":
+                columns = ("season", "driver_id", "team_id", "position", "points", "payload")
+                values = [(season, r["driver"]["id"], (r.get("team") or {}).get("id"), r.get("position"),
+                           r.get("points"), json.dumps(r)) for r in rows]
+            else:
+                columns = ("season", "team_id", "position", "points", "payload")
+                values = [(season, r["team"]["id"], r.get("position"), r.get("points"), json.dumps(r)) for r in rows]
+            # Una classifica e' definitiva solo se salvata quando le gare erano gia' tutte concluse
+            final = self.season_is_final(season)
+
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {table} WHERE season = ?", (season,))
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                values)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO season_synced (endpoint, season, final, fetched_at) VALUES (?, ?, ?, ?)",
+                (endpoint, season, int(final), _now()))
+
+    def load_season(self, endpoint, season):
+        """Stored `endpoint` table of `season`: races by date, rankings by position (ties in API order)."""
+        table, entity = SEASON_TABLES[endpoint]
+        order = "date, race_id" if entity is None else "position, rowid"
+        with self._lock:
+            rows = self._conn.execute(f"SELECT payload FROM {table} WHERE season = ? ORDER BY {order}",
+                                      (season,)).fetchall()
+        return [json.loads(payload) for payload, in rows]
+
+    def season_is_final(self, season):
+        """True for a past season whose stored races are all completed or cancelled."""
+        if not _season_is_past(season):
+            return False
+        with self._lock:
+            total, final = self._conn.execute(
+                f"SELECT COUNT(*), SUM(status IN ({','.join('?' * len(FINAL_STATUSES))})) FROM races WHERE season = ?",
+                (*FINAL_STATUSES, season)).fetchone()
+        return total > 0 and total == final
+
+    def season_laps_are_final(self, season):
+        """True for a final season whose races all have their laps stored as final."""
+        if not self.season_is_final(season):
+            return False
+        race_ids = {race["id"] for race in self.load_season("races", season)}
+        return self.final_race_ids(race_ids) == race_ids
+
+    def final_race_ids(self, race_ids):
+        """Races among `race_ids` whose laps were stored once the race was final."""
+        race_ids = [int(r) for r in race_ids]
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT race_id FROM fastest_laps_synced WHERE race_id IN ({','.join('?' * len(race_ids))}) "
+                f"AND status IN ({','.join('?' * len(FINAL_STATUSES))})",
+                (*race_ids, *FINAL_STATUSES)).fetchall()
+        return {race_id for race_id, in rows}
+
+    def save_laps(self, race_id, laps: pd.DataFrame, status):
+        """
+        Replaces the stored laps of `race_id`. An empty table of a race that was not
+        cancelled (ranking not published yet, transient empty response) is never stored
+        as final, so the race is fetched again.
+        """
+        if laps.empty and status != "Cancelled":
+            status = None
+        rows = laps.rename(columns=LAP_COLUMNS)[list(LAP_COLUMNS.values())]
+        rows = rows.astype(object).where(rows.notna(), None)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM fastest_laps WHERE race_id = ?", (int(race_id),))
+            self._conn.executemany(
+                f"INSERT INTO fastest_laps (race_id, {', '.join(LAP_COLUMNS.values())}) "
+                f"VALUES ({', '.join('?' * (len(LAP_COLUMNS) + 1))})",
+                [(int(race_id), *row) for row in rows.itertuples(index=False)])
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fastest_laps_synced (race_id, status, fetched_at) VALUES (?, ?, ?)",
+                (int(race_id), status, _now()))
+
+    def load_laps(self, race_ids):
+        """Stored laps of `race_ids` in one long frame: race_id + the columns of `laps_frame`."""
+        race_ids = [int(r) for r in race_ids]
+        with self._lock:
+            laps = pd.read_sql_query(
+                f"SELECT race_id, {', '.join(LAP_COLUMNS.values())} FROM fastest_laps "
+                f"WHERE race_id IN ({','.join('?' * len(race_ids))}) ORDER BY race_id, position",
+                self._conn, params=race_ids)
+        return laps.rename(columns={sql: name for name, sql in LAP_COLUMNS.items()})
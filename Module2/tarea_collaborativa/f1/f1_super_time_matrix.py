@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+from f1_data_preprocessing import SUPER_TIME_ENTITY_COLUMNS
+
+
+# Gare su cui si calcola la forma recente (media mobile del Super Time)
+FORM_WINDOW = 3
+
+
+def _ms_to_timing(ms):
+    """Inverse of `timing_to_ms` for lap times (M:SS.mmm), on a whole array."""
+    ms = np.asarray(ms, dtype=np.int64)
+    return np.char.add((ms // 60000).astype(str), np.char.mod(":%06.3f", (ms % 60000) / 1000))
+
+
+class SuperTimeMatrix:
+    """
+    Dense race x driver and race x team matrices of best-lap times, built once from the
+    `compute_super_times` table (one or more seasons).
+
+    `times[by][r, e]` is the best lap (ms) of entity e in race r, NaN if it has no time;
+    the team matrix is the NaN-ignoring minimum over the team's drivers. Ratios, the
+    long frames for the charts, season averages and rolling form are slices and
+    reductions of these arrays, so switching between driver and team costs no groupby.
+    """
+
+    def __init__(self, super_times: pd.DataFrame):
+        super_times = super_times.dropna(subset=["time_ms"])
+        race_columns = (["season"] if "season" in super_times else []) + ["race_index", "race_id", "race_name"]
+        self.races = super_times[race_columns].drop_duplicates("race_id").reset_index(drop=True)
+        self.races["race_name"] = self.races["race_name"].astype(str)
+        race = pd.Index(self.races["race_id"]).get_indexer(super_times["race_id"])
+        ms = super_times["time_ms"].to_numpy(dtype=float)
+
+        self.entities, self.entity_index, self.images, self.times = {}, {}, {}, {}
+        for by, columns in SUPER_TIME_ENTITY_COLUMNS.items():
+            name_column, image_column = columns
+            names = super_times[name_column].astype(str).to_numpy()
+            self.entities[by] = np.unique(names)
+            self.entity_index[by] = {name: i for i, name in enumerate(self.entities[by])}
+            entity = np.searchsorted(self.entities[by], names)
+
+            images = super_times[image_column].astype(object).to_numpy()
+            self.images[by] = np.empty(len(self.entities[by]), dtype=object)
+            self.images[by][entity] = images  # ultima immagine vista per entita'
+
+            times = np.full((len(self.races), len(self.entities[by])), np.nan)
+            np.fmin.at(times, (race, entity), ms)
+            self.times[by] = times
+
+        # Giro di riferimento di ogni gara: il migliore tra tutti i piloti
+        driver_times = self.times["driver"]
+        self.best = np.fmin.reduce(driver_times, axis=1) if driver_times.size else np.full(len(self.races), np.nan)
+
+    def ratio(self, by="driver"):
+        """Race x entity array of super-time ratios (1 = best lap of the race)."""
+        return self.times[by] / self.best[:, None]
+
+    def matrix(self, by="driver"):
+        """Race x entity DataFrame of super-time ratios."""
+        return pd.DataFrame(self.ratio(by), index=pd.Index(self.races["race_id"]), columns=self.entities[by])
+
+    def _race_seasons(self):
+        if "season" in self.races:
+            return self.races["season"].to_numpy()
+        return np.zeros(len(self.races), dtype=int)
+
+    def form(self, by="driver", window=FORM_WINDOW):
+        """
+        Race x entity array: mean ratio over the last `window` races in which the entity set
+        a time, within the same season (the window restarts every season). NaN where the
+        entity has no time.
+        """
+        ratio = self.ratio(by)
+        form = np.full(ratio.shape, np.nan)
+        # Tempi di ogni entita' in ordine di gara (entita' per entita')
+        entity, race = np.nonzero(~np.isnan(ratio.T))
+        if not len(race):
+            return form
+        seasons = self._race_seasons()[race]
+        new_group = np.r_[True, (entity[1:] != entity[:-1]) | (seasons[1:] != seasons[:-1])]
+        group_start = np.flatnonzero(new_group)[np.cumsum(new_group) - 1]
+
+        # Media mobile con le somme cumulate: la finestra non esce dal gruppo (entita', stagione)
+        end = np.arange(1, len(race) + 1)
+        start = np.maximum(end - window, group_start)
+        totals = np.r_[0, np.cumsum(ratio[race, entity])]
+        form[race, entity] = (totals[end] - totals[start]) / (end - start)
+        return form
+
+    def frame(self, by="driver"):
+        """
+        Long frame for `plot_super_time`: one row per (race, entity) with a time.
+
+        Returns:
+            pd.DataFrame con colonne:
+                [season,] race_index, race_name, entity_name, image_url, time, time_ms,
+                superTimeRatio, superTimeDelta%, form
+        """
+        ratio = self.ratio(by)
+        race, entity = np.nonzero(~np.isnan(ratio))
+        frame = self.races.iloc[race].drop(columns="race_id").reset_index(drop=True)
+        frame["entity_name"] = pd.Categorical(self.entities[by][entity])
+        frame["image_url"] = self.images[by][entity]
+        frame["time"] = _ms_to_timing(self.times[by][race, entity])
+        frame["time_ms"] = self.times[by][race, entity].astype(np.int64)
+        frame["superTimeRatio"] = ratio[race, entity].astype(np.float32)
+        frame["superTimeDelta%"] = ((frame["superTimeRatio"] - 1) * 100).round(2)
+        frame["form"] = self.form(by)[race, entity].astype(np.float32)
+        return frame
+
+    def season_average(self, by="driver"):
+        """
+        Mean super-time ratio per season and entity (seasons without a time are left out).
+
+        Returns:
+            pd.DataFrame con colonne: season, entity_name, superTimeRatio, races
+        """
+        ratio = self.ratio(by)
+        if not len(ratio):
+            return pd.DataFrame(columns=["season", "entity_name", "superTimeRatio", "races"])
+        seasons = self._race_seasons()
+        # Le gare sono ordinate per stagione: ogni stagione e' un blocco contiguo di righe
+        starts = np.flatnonzero(np.r_[True, seasons[1:] != seasons[:-1]])
+        has_time = ~np.isnan(ratio)
+        races = np.add.reduceat(has_time, starts, axis=0)
+        totals = np.add.reduceat(np.where(has_time, ratio, 0), starts, axis=0)
+
+        season, entity = np.nonzero(races)
+        return pd.DataFrame({
+            "season": seasons[starts][season],
+            "entity_name": pd.Categorical(self.entities[by][entity]),
+            "superTimeRatio": totals[season, entity] / races[season, entity],
+            "races": races[season, entity],
+        })
@@ -1,23 +1,32 @@
+from pathlib import Path
+
 import streamlit as st
 import requests
+import pandas as pd
+import pyarrow.dataset as ds
 
+from common.datasets import DatasetHandle
+from common.prefetch import Prefetcher, quiet_script_run_context_warnings
+from football_client import FootballClient
+from football_fixture_details import FINISHED_STATUSES, FixtureDetailStore, ingest_fixture_details
+from football_head_to_head import HeadToHead
+from football_ratings import EloRatings
+from football_data_preprocessing import build_team_match_df, decode_fixtures, decode_leagues, decode_teams
+from football_standings import LeagueStandings
 
-# Configurazione base
-BASE_URL = "https://v3.football.api-sports.io"
-HEADERS = {
-    "x-apisports-key": st.secrets["api_football"]["API_FOOTBALL_KEY"],
-    "x-rapidapi-host": "v3.football.api-sports.io"
-}
 
+DATA_DIR = Path(__file__).resolve().parent / "data"
 
+@st.cache_resource
+def get_client():
+    # Un solo client (e un solo rate limiter) condiviso da tutte le sessioni dell'app
+    return FootballClient(st.secrets["api_football"]["API_FOOTBALL_KEY"])
 
 
 @st.cache_data
 def get_countries():
     try:
-        r = requests.get(f"{BASE_URL}/countries", headers=HEADERS)
-        r.raise_for_status()  # Check if the request was successful
-        return [c['name'] for c in r.json()['response']]
+        return get_client().get_countries()
     except requests.exceptions.RequestException as e:
         st.write(f"Error fetching countries: {e}")
         st.stop()  # Stop the app
@@ -25,10 +34,7 @@ def get_countries():
 @st.cache_data
 def get_leagues(country):
     try:
-        r = requests.get(f"{BASE_URL}/leagues", headers=HEADERS, params={"country": country})
-        r.raise_for_status()  # Check if the request was successful
-        leagues = r.json()['response']
-        return leagues
+        return get_client().get_leagues(country)
     except requests.exceptions.RequestException as e:
         st.write(f"Error fetching leagues for country {country}: {e}")
         st.stop()  # Stop the app
@@ -36,29 +42,114 @@ def get_leagues(country):
 @st.cache_data
 def get_seasons(league_id):
     try:
-        r = requests.get(f"{BASE_URL}/leagues", headers=HEADERS, params={"id": league_id})
-        r.raise_for_status()  # Check if the request was successful
-        return [s['year'] for s in r.json()['response'][0]['seasons']]
+        return get_client().get_seasons(league_id)
     except requests.exceptions.RequestException as e:
         st.write(f"Error fetching seasons for league {league_id}: {e}")
         st.stop()  # Stop the app
 
+# Fixtures e team: la parte in cache solleva l'errore (un errore non viene messo in
+# cache), cosi' anche il prefetch in background puo' riempirla senza toccare la pagina
 @st.cache_data
+def fetch_fixtures(league_id, season):
+    return get_client().get_fixtures(league_id, season)
+
 def get_fixtures(league_id, season):
     try:
-        r = requests.get(f"{BASE_URL}/fixtures", headers=HEADERS, params={"league": league_id, "season": season})
-        r.raise_for_status()  # Check if the request was successful
-        return r.json()['response']
+        return fetch_fixtures(league_id, season)
     except requests.exceptions.RequestException as e:
         st.write(f"Error fetching fixtures for league {league_id} and season {season}: {e}")
         st.stop()  # Stop the app
 
 @st.cache_data
+def fetch_teams(league_id, year):
+    return get_client().get_teams(league_id, year)
+
 def get_teams(league_id, year):
     try:
-        r = requests.get(f"{BASE_URL}/teams", headers=HEADERS, params={"league": league_id, "season": year})
-        r.raise_for_status()  # Check if the request was successful
-        return r.json()['response']
+        return fetch_teams(league_id, year)
     except requests.exceptions.RequestException as e:
         st.write(f"Error fetching teams for league {league_id} and year {year}: {e}")
         st.stop()  # Stop the app
+
+@st.cache_data
+def get_leagues_df(country):
+    return decode_leagues(get_leagues(country))
+
+@st.cache_data
+def get_fixtures_df(league_id, season):
+    return decode_fixtures(get_fixtures(league_id, season))
+
+@st.cache_data
+def get_teams_df(league_id, season):
+    return decode_teams(get_teams(league_id, season))
+
+@st.cache_data
+def get_team_matches(league_id, season):
+    # Una sola trasformazione O(n) per versione delle fixtures (league, season),
+    # condivisa da tutti i grafici della pagina
+    return build_team_match_df(get_fixtures_df(league_id, season))
+
+@st.cache_resource
+def get_team_matches_handle(league_id, season):
+    # cache_resource: l'handle e' immutabile, viene condiviso senza copie e il suo
+    # fingerprint resta stabile finche' le fixtures restano in cache
+    return DatasetHandle("fixtures>team_matches", {"league": league_id, "season": season},
+                         get_team_matches(league_id, season))
+
+@st.cache_data
+def get_standings(league_id, season):
+    return LeagueStandings(get_team_matches(league_id, season))
+
+@st.cache_data
+def get_head_to_head(league_id, seasons):
+    # seasons come tupla ordinata: stessa chiave di cache per la stessa selezione
+    team_matches = pd.concat([get_team_matches(league_id, s) for s in seasons], ignore_index=True)
+    return HeadToHead(team_matches)
+
+@st.cache_data
+def get_ratings(league_id, season):
+    ratings = EloRatings()
+    ratings.update(get_team_matches(league_id, season))
+    return ratings
+
+@st.cache_data(show_spinner="Loading match statistics...")
+def get_fixture_statistics(league_id, season):
+    # Statistiche per partita: scaricate a blocchi di 20 fixtures e salvate in locale,
+    # quindi una stagione intera costa poche richieste, e solo la prima volta
+    fixtures = get_fixtures_df(league_id, season)
+    ids = fixtures.loc[fixtures['fixture.status.short'].isin(FINISHED_STATUSES), 'fixture.id'].tolist()
+    store = FixtureDetailStore(DATA_DIR / "fixture_details")
+    try:
+        ingest_fixture_details(get_client(), ids, store)
+    except requests.exceptions.RequestException as e:
+        st.write(f"Error fetching fixture details for league {league_id} and season {season}: {e}")
+        st.stop()  # Stop the app
+    return store.statistics.read(filter=ds.field('fixture_id').isin(ids))
+
+
+@st.cache_resource
+def get_prefetcher():
+    quiet_script_run_context_warnings()
+    return Prefetcher(get_client().limiter)
+
+
+def _warm_season(league_id, season):
+    # Prima le due richieste (sollevano in caso di errore), poi le tabelle derivate
+    fetch_fixtures(league_id, season)
+    fetch_teams(league_id, season)
+    get_teams_df(league_id, season)
+    get_team_matches_handle(league_id, season)
+    get_standings(league_id, season)
+
+
+def prefetch_adjacent_seasons(league_id, season, seasons):
+    """
+    Warms the caches of the seasons next to `season` (the previous one first) in the
+    background, within the prefetch request budget.
+    """
+    seasons = sorted(seasons)
+    position = seasons.index(season)
+    neighbours = [seasons[i] for i in (position - 1, position + 1) if 0 <= i < len(seasons)]
+    get_prefetcher().schedule([
+        (("season", league_id, s), 2, lambda s=s: _warm_season(league_id, s)) for s in neighbours
+    ])
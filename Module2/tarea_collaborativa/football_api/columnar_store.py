@@ -0,0 +1,54 @@
+import os
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+class ParquetStore:
+    """
+    Append-only columnar store: a directory of Parquet parts, one per appended chunk.
+
+    Chunks are written as they arrive (e.g. one API page at a time), so ingesting a whole
+    league never holds more than one chunk in memory. Every part has a key, which makes
+    interrupted ingests resumable (`has(key)`).
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def _part(self, key):
+        return self.path / f"{key}.parquet"
+
+    def has(self, key):
+        return self._part(key).exists()
+
+    def keys(self):
+        return sorted(p.stem for p in self.path.glob("*.parquet"))
+
+    def append(self, df: pd.DataFrame, key):
+        """Writes `df` as the part `key` (atomically: a partial file is never visible)."""
+        # File temporaneo unico (nascosto al dataset): piu' writer possono scrivere la stessa parte
+        with tempfile.NamedTemporaryFile(dir=self.path, prefix=f".{key}.", suffix=".parquet.tmp", delete=False) as tmp:
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp)
+        try:
+            os.replace(tmp.name, self._part(key))
+        except OSError:
+            os.unlink(tmp.name)
+            raise
+
+    def dataset(self):
+        return ds.dataset(self.path, format="parquet", exclude_invalid_files=True)
+
+    def read(self, columns=None, filter=None) -> pd.DataFrame:
+        """
+        Reads the store back, optionally only some columns and the rows matching a
+        pyarrow expression (e.g. `ds.field("team.id") == 40`).
+        """
+        if not self.keys():
+            return pd.DataFrame(columns=columns)
+        return self.dataset().to_table(columns=columns, filter=filter).to_pandas()
@@ -1,8 +1,22 @@
 from api_football_calls import *
 from viz import *
 import streamlit as st
-from api_football_calls import get_countries, get_leagues, get_seasons, get_fixtures
+from api_football_calls import get_countries, get_leagues_df, get_seasons, get_fixtures_df, get_teams_df, get_team_matches_handle, get_standings, get_head_to_head, get_ratings, get_fixture_statistics, prefetch_adjacent_seasons
 import pandas as pd
+from common.datasets import HASH_FUNCS, on_view
+
+
+# Le viste passate ai grafici non possono modificare i dati in cache
+pd.set_option("mode.copy_on_write", True)
+
+# Grafici in cache sul fingerprint del dataset, non sul contenuto del DataFrame
+cache_chart = st.cache_data(hash_funcs=HASH_FUNCS)
+donut_chart = cache_chart(on_view(donut_side_chart_plotly))
+cumulative_points_chart = cache_chart(on_view(cumulative_points))
+home_v_away_chart = cache_chart(on_view(home_v_away_wins))
+goals_chart = cache_chart(on_view(goal_scored_vs_conceeded))
+weekday_chart = cache_chart(on_view(win_per_weekday_distribution))
+team_trend_chart = cache_chart(on_view(team_trend_analysis))
 
 
 st.set_page_config(layout="wide")
@@ -10,56 +24,103 @@ st.title("📊 Football Visual Analytics (API-Football)")
 
 # --- SELEZIONE DINAMICA ---
 country = st.selectbox("Select Country", get_countries())
-league_df = pd.json_normalize(get_leagues(country))
+league_df = get_leagues_df(country)
 league_name = st.selectbox("Select Competition", league_df['league.name'])
-league_id = league_df.loc[league_df['league.name'] == league_name, 'league.id']
+league_id = int(league_df.loc[league_df['league.name'] == league_name, 'league.id'].iloc[0])
 
 seasons = get_seasons(league_id)
 season = st.selectbox("Select Season", seasons[::-1], index=1)
 
 # --- OTTIENI FIXTURES ---
 with st.spinner("Loading..."):
-    fixtures_raw = get_fixtures(league_id, season)
-    df_fixtures = pd.json_normalize(fixtures_raw)
-    df_teams = pd.json_normalize(get_teams(league_id, season))
+    df_fixtures = get_fixtures_df(league_id, season)
+    df_teams = get_teams_df(league_id, season)
+    team_matches = get_team_matches_handle(league_id, season)
 
 if df_teams.empty or df_fixtures.empty:
     st.error('No data available, please change selecion')
     st.stop()
 
 st.header('Fixtures')
-st.write(df_fixtures)
+st.dataframe(df_fixtures, hide_index=True)
 
 st.header('Teams')
-st.write(df_teams)
+st.dataframe(df_teams, hide_index=True)
 
-# --- VISUALIZZAZIONI (basate su df_fixtures) ---
+# --- VISUALIZZAZIONI (basate sulla tabella team-match) ---
 cols = st.columns(2, gap = "large")
 with cols[0]:
-    fig, ax = donut_side_chart(df_fixtures, side='home')
-    st.pyplot(fig)
+    fig = donut_chart(team_matches, side='home')
+    st.plotly_chart(fig)
 with cols[-1]:
-    fig, ax = donut_side_chart(df_fixtures, side='away')
-    st.pyplot(fig)
+    fig = donut_chart(team_matches, side='away')
+    st.plotly_chart(fig)
 
 
 
-fig = cumulative_points(df_fixtures)
+st.header("League Table")
+standings = get_standings(league_id, season)
+if standings.n_matchdays == 0:
+    st.info('No matches played yet')
+else:
+    matchday = standings.n_matchdays
+    if standings.n_matchdays > 1:
+        matchday = st.slider("As of matchday", 1, standings.n_matchdays, standings.n_matchdays)
+    st.dataframe(standings.table(matchday), hide_index=True)
+
+    fig = position_history_chart(standings)
+    st.plotly_chart(fig)
+
+fig = cumulative_points_chart(team_matches)
 st.plotly_chart(fig)
 
 
-fig = home_v_away_wins(df_fixtures, n_teams=len(df_teams))
+fig = home_v_away_chart(team_matches, n_teams=len(df_teams))
 st.plotly_chart(fig)
 
 
-fig = goal_scored_vs_conceeded(df_fixtures)
+fig = goals_chart(team_matches)
 st.plotly_chart(fig)
 
-fig = win_per_weekday_distribution(df_fixtures)
+fig = weekday_chart(team_matches)
 st.plotly_chart(fig)
 
+st.header("Match Statistics")
+statistics = get_fixture_statistics(league_id, season)
+if statistics.empty:
+    st.info('No match statistics available for this season')
+else:
+    stat_type = st.selectbox("Statistic", sorted(statistics['type'].dropna().unique()))
+    st.plotly_chart(match_stat_chart(statistics, stat_type))
+
 st.header("Team Trend")
 team_selected = st.selectbox("Select team", options = df_teams['team.name'])
-fig = team_trend_analysis(df_fixtures, team=team_selected)
+fig = team_trend_chart(team_matches, team=team_selected)
 st.plotly_chart(fig)
 
+ratings = get_ratings(league_id, season)
+fig = rating_trend_chart(ratings, teams=[team_selected])
+st.plotly_chart(fig)
+
+
+st.header("Head to Head")
+h2h_seasons = st.multiselect("Seasons", seasons[::-1], default=[season])
+if h2h_seasons:
+    h2h = get_head_to_head(league_id, tuple(sorted(h2h_seasons)))
+    if len(h2h.teams) < 2:
+        st.info('Not enough matches played for a head to head')
+    else:
+        metric = st.selectbox("Metric", ['points_per_game', 'wins', 'draws', 'losses', 'goal_diff', 'goals_for', 'goals_against', 'played'])
+        st.plotly_chart(head_to_head_heatmap(h2h, metric=metric))
+
+        team_col, opponent_col = st.columns(2)
+        h2h_team = team_col.selectbox("Team", h2h.teams)
+        h2h_opponent = opponent_col.selectbox("Opponent", [t for t in h2h.teams if t != h2h_team])
+        record = h2h.pair(h2h_team, h2h_opponent)
+        for col, (label, key) in zip(st.columns(6), [('Played', 'played'), ('Wins', 'wins'), ('Draws', 'draws'),
+                                                     ('Losses', 'losses'), ('Goals for', 'goals_for'), ('Goals against', 'goals_against')]):
+            col.metric(label, record[key])
+
+
+# Le stagioni vicine si preparano in background mentre si guarda questa
+prefetch_adjacent_seasons(league_id, season, seasons)
@@ -0,0 +1,123 @@
+"""
+Headless batch runner for the football analytics.
+
+Fetches the fixtures of every (league, season) through the rate-limited client,
+builds the team-match and standings tables in a process pool and writes the
+combined tables as Parquet files. Elo ratings are kept in <out>/ratings.pkl and
+updated incrementally: a rerun only applies the fixtures played since the last one. With --players it also streams the squads and
+player statistics of every team into an append-only Parquet store (<out>/players).
+
+Usage:
+    API_FOOTBALL_KEY=... python football_batch.py --leagues 39 135 --seasons 2021 2022 2023 --out data
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from columnar_store import ParquetStore
+from football_client import FootballClient
+from football_data_preprocessing import build_team_match_df, decode_fixtures
+from football_players import ingest_players
+from football_ratings import EloRatings
+from football_standings import LeagueStandings
+
+
+def fetch_fixtures(client, league_id, season, raw_dir, refresh=False):
+    """Returns the raw fixtures, reading them from `raw_dir` when they were already downloaded."""
+    path = raw_dir / f"fixtures_{league_id}_{season}.json"
+    if path.exists() and not refresh:
+        return json.loads(path.read_text())
+    fixtures = client.get_fixtures(league_id, season)
+    path.write_text(json.dumps(fixtures))
+    return fixtures
+
+
+def transform(league_id, season, fixtures_raw):
+    """Per-league transform, executed in a worker process."""
+    team_matches = build_team_match_df(decode_fixtures(fixtures_raw))
+    standings = LeagueStandings(team_matches).all_tables()
+    for df in (team_matches, standings):
+        df.insert(0, 'season', season)
+        df.insert(0, 'league_id', league_id)
+    return team_matches, standings
+
+
+def run(client, leagues, seasons, out_dir, workers=None, refresh=False, players=False):
+    out_dir = Path(out_dir)
+    raw_dir = out_dir / "raw"
+    raw_dir.mkdir(parents=True, exist_ok=True)
+
+    jobs = [(league_id, season) for league_id in leagues for season in seasons]
+    team_matches, standings = [], []
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        # Le richieste sono sequenziali (le limita comunque il rate limiter),
+        # le trasformazioni partono in parallelo man mano che arrivano i dati
+        for league_id, season in jobs:
+            fixtures = fetch_fixtures(client, league_id, season, raw_dir, refresh=refresh)
+            if not fixtures:
+                print(f"No fixtures for league {league_id}, season {season}")
+                continue
+            futures.append(pool.submit(transform, league_id, season, fixtures))
+
+        for future in futures:
+            tm, tables = future.result()
+            team_matches.append(tm)
+            standings.append(tables)
+
+    if not team_matches:
+        print("Nothing to write")
+        return
+
+    team_matches = pd.concat(team_matches, ignore_index=True)
+    standings = pd.concat(standings, ignore_index=True)
+    for df in (team_matches, standings):
+        df['team'] = df['team'].astype('category')
+    team_matches['opponent'] = team_matches['opponent'].astype('category')
+
+    team_matches.to_parquet(out_dir / "team_matches.parquet", index=False)
+    standings.to_parquet(out_dir / "standings.parquet", index=False)
+    print(f"Wrote {len(team_matches)} team-match rows and {len(standings)} standings rows to {out_dir}")
+
+    ratings_path = out_dir / "ratings.pkl"
+    ratings = EloRatings.load(ratings_path) if ratings_path.exists() else EloRatings()
+    new_fixtures = ratings.update(team_matches)
+    ratings.save(ratings_path)
+    ratings.history().to_parquet(out_dir / "ratings_history.parquet", index=False)
+    print(f"Applied {new_fixtures} new fixtures to the Elo ratings")
+
+    if players:
+        store = ParquetStore(out_dir / "players")
+        for league_id, season in jobs:
+            rows = ingest_players(client, league_id, season, store)
+            print(f"Ingested {rows} player rows for league {league_id}, season {season}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leagues", type=int, nargs="+", required=True, help="API-Football league ids")
+    parser.add_argument("--seasons", type=int, nargs="+", required=True, help="season years, e.g. 2022 2023")
+    parser.add_argument("--out", default="data", help="output directory")
+    parser.add_argument("--workers", type=int, default=None, help="size of the process pool")
+    parser.add_argument("--requests-per-minute", type=int, default=10, help="API quota of the plan")
+    parser.add_argument("--refresh", action="store_true", help="download fixtures again even if cached")
+    parser.add_argument("--players", action="store_true", help="also ingest squads and player statistics")
+    parser.add_argument("--api-key", default=os.environ.get("API_FOOTBALL_KEY"),
+                        help="API-Football key (default: $API_FOOTBALL_KEY)")
+    args = parser.parse_args()
+
+    if not args.api_key:
+        parser.error("an API key is required (--api-key or $API_FOOTBALL_KEY)")
+
+    client = FootballClient(args.api_key, requests_per_minute=args.requests_per_minute)
+    run(client, args.leagues, args.seasons, args.out, workers=args.workers, refresh=args.refresh,
+        players=args.players)
+
+
+if __name__ == "__main__":
+    main()
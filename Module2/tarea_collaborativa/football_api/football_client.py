@@ -0,0 +1,76 @@
+import requests
+
+from common.rate_limiter import TokenBucket, rate_limited_get
+
+
+BASE_URL = "https://v3.football.api-sports.io"
+FIXTURE_IDS_PER_REQUEST = 20  # limite del parametro `ids` di /fixtures
+
+
+class FootballClient:
+    """
+    Streamlit-free API-Football client. Every request goes through a shared token
+    bucket, so scripts and apps stay under the plan's per-minute quota.
+
+    Args:
+        api_key: API-Football key.
+        requests_per_minute: quota of the subscription plan (10 on the free plan).
+    """
+
+    def __init__(self, api_key, requests_per_minute=10, session=None):
+        self.session = session or requests.Session()
+        self.session.headers.update({
+            "x-apisports-key": api_key,
+            "x-rapidapi-host": "v3.football.api-sports.io"
+        })
+        self.limiter = TokenBucket.per_minute(requests_per_minute)
+
+    def request(self, endpoint, params=None):
+        """Full JSON payload of one request (response, paging, errors, ...)."""
+        return rate_limited_get(self.session, self.limiter, f"{BASE_URL}/{endpoint}", params=params)
+
+    def get(self, endpoint, params=None):
+        return self.request(endpoint, params)['response']
+
+    def iter_pages(self, endpoint, params=None):
+        """
+        Generator over a paginated endpoint: yields the `response` of each page as soon
+        as it arrives, following `paging.current` / `paging.total`.
+        """
+        params = dict(params or {})
+        page = 1
+        while True:
+            payload = self.request(endpoint, {**params, "page": page})
+            yield payload['response']
+            paging = payload.get('paging') or {}
+            if paging.get('current', page) >= paging.get('total', 1):
+                return
+            page += 1
+
+    def get_countries(self):
+        return [c['name'] for c in self.get("countries")]
+
+    def get_leagues(self, country):
+        return self.get("leagues", {"country": country})
+
+    def get_seasons(self, league_id):
+        return [s['year'] for s in self.get("leagues", {"id": league_id})[0]['seasons']]
+
+    def get_fixtures(self, league_id, season):
+        return self.get("fixtures", {"league": league_id, "season": season})
+
+    def get_teams(self, league_id, season):
+        return self.get("teams", {"league": league_id, "season": season})
+
+    def get_fixtures_by_ids(self, fixture_ids):
+        """
+        Full fixture details (events, lineups, statistics, players) of up to
+        FIXTURE_IDS_PER_REQUEST fixtures in one request.
+        """
+        if len(fixture_ids) > FIXTURE_IDS_PER_REQUEST:
+            raise ValueError(f"at most {FIXTURE_IDS_PER_REQUEST} fixture ids per request, got {len(fixture_ids)}")
+        return self.get("fixtures", {"ids": "-".join(str(i) for i in fixture_ids)})
+
+    def iter_players(self, team_id, season):
+        """Pages of players (with their season statistics) of a team."""
+        return self.iter_pages("players", {"team": team_id, "season": season})
@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+
+
+TEAM_MATCH_COLUMNS = [
+    'fixture_id', 'date', 'matchday', 'side', 'team_id', 'team', 'opponent_id', 'opponent',
+    'goals_for', 'goals_against', 'result', 'points',
+]
+
+
+def _side_frame(df_fixtures, side):
+    other = 'away' if side == 'home' else 'home'
+    winner = df_fixtures[f'teams.{side}.winner']
+    goals_for = df_fixtures[f'goals.{side}']
+
+    # True -> vittoria, False -> sconfitta, None con gol -> pareggio
+    is_win = winner.eq(True).to_numpy(dtype=bool, na_value=False)
+    is_loss = winner.eq(False).to_numpy(dtype=bool, na_value=False)
+    result = np.select([is_win, is_loss], ['W', 'L'], default='D')
+    points = np.select([is_win, is_loss], [3, 0], default=1)
+
+    return pd.DataFrame({
+        'fixture_id': df_fixtures['fixture.id'].to_numpy(),
+        'date': df_fixtures['fixture.date'].to_numpy(),
+        'round': df_fixtures['league.round'].to_numpy(),
+        'side': side,
+        'team_id': df_fixtures[f'teams.{side}.id'].to_numpy(),
+        'opponent_id': df_fixtures[f'teams.{other}.id'].to_numpy(),
+        # .array mantiene i nomi categorici prodotti da decode_fixtures
+        'team': df_fixtures[f'teams.{side}.name'].array,
+        'opponent': df_fixtures[f'teams.{other}.name'].array,
+        'goals_for': goals_for.to_numpy(),
+        'goals_against': df_fixtures[f'goals.{other}'].to_numpy(),
+        'result': result,
+        'points': points,
+    })
+
+
+def build_team_match_df(df_fixtures: pd.DataFrame) -> pd.DataFrame:
+    """
+    Builds the team-match fact table: one row per team per played fixture.
+
+    Args:
+        df_fixtures: fixtures as returned by `decode_fixtures` (or `pd.json_normalize`)
+
+    Returns:
+        pd.DataFrame with columns:
+            fixture_id, date, matchday, side, team_id, team, opponent_id, opponent, goals_for,
+            goals_against, result, points
+        sorted by date. Fixtures not played yet (no goals) are dropped.
+        `matchday` is the number in `league.round` ("Regular Season - 12" -> 12); for
+        competitions whose rounds are not numbered it falls back to the team's game number.
+    """
+    if df_fixtures.empty:
+        return pd.DataFrame(columns=TEAM_MATCH_COLUMNS)
+
+    played = df_fixtures[df_fixtures['goals.home'].notna() & df_fixtures['goals.away'].notna()]
+    team_matches = pd.concat([_side_frame(played, 'home'), _side_frame(played, 'away')], ignore_index=True)
+
+    team_matches['date'] = pd.to_datetime(team_matches['date'], utc=True)
+    team_matches['goals_for'] = team_matches['goals_for'].astype('int32')
+    team_matches['goals_against'] = team_matches['goals_against'].astype('int32')
+    team_matches['side'] = team_matches['side'].astype('category')
+    team_matches['result'] = pd.Categorical(team_matches['result'], categories=['W', 'D', 'L'])
+
+    team_matches = team_matches.sort_values(['date', 'fixture_id', 'side'], kind='stable').reset_index(drop=True)
+
+    matchday = pd.to_numeric(team_matches['round'].str.extract(r'(\d+)\s*$')[0], errors='coerce')
+    if matchday.isna().any():
+        matchday = team_matches.groupby('team', observed=True).cumcount() + 1
+    team_matches['matchday'] = matchday.astype('int32')
+
+    return team_matches[TEAM_MATCH_COLUMNS]
+
+
+# --- DECODER: solo i campi dichiarati, gia' tipizzati ---
+# Ogni schema e' una lista di (colonna, percorso nel JSON, dtype).
+# "category:<gruppo>" crea colonne categoriche che condividono le stesse categorie.
+
+FIXTURE_SCHEMA = [
+    ('fixture.id', ('fixture', 'id'), 'int64'),
+    ('fixture.date', ('fixture', 'date'), 'datetime'),
+    ('fixture.status.short', ('fixture', 'status', 'short'), 'category'),
+    ('league.round', ('league', 'round'), 'category'),
+    ('teams.home.id', ('teams', 'home', 'id'), 'int64'),
+    ('teams.home.name', ('teams', 'home', 'name'), 'category:team'),
+    ('teams.home.winner', ('teams', 'home', 'winner'), 'boolean'),
+    ('teams.away.id', ('teams', 'away', 'id'), 'int64'),
+    ('teams.away.name', ('teams', 'away', 'name'), 'category:team'),
+    ('teams.away.winner', ('teams', 'away', 'winner'), 'boolean'),
+    ('goals.home', ('goals', 'home'), 'Int16'),
+    ('goals.away', ('goals', 'away'), 'Int16'),
+]
+
+TEAM_SCHEMA = [
+    ('team.id', ('team', 'id'), 'int64'),
+    ('team.name', ('team', 'name'), 'string'),
+    ('team.code', ('team', 'code'), 'string'),
+    ('team.founded', ('team', 'founded'), 'Int16'),
+    ('team.logo', ('team', 'logo'), 'string'),
+    ('venue.name', ('venue', 'name'), 'string'),
+    ('venue.city', ('venue', 'city'), 'category'),
+    ('venue.capacity', ('venue', 'capacity'), 'Int32'),
+]
+
+LEAGUE_SCHEMA = [
+    ('league.id', ('league', 'id'), 'int64'),
+    ('league.name', ('league', 'name'), 'string'),
+    ('league.type', ('league', 'type'), 'category'),
+    ('country.name', ('country', 'name'), 'category'),
+]
+
+
+def _lookup(record, path):
+    for key in path:
+        if record is None:
+            return None
+        record = record.get(key)
+    return record
+
+
+def decode(records, schema):
+    """
+    Decodes a list of API-Football records reading only the fields declared in `schema`.
+
+    Args:
+        records: list of dicts, the `response` of an endpoint
+        schema: list of (column, path, dtype) tuples
+
+    Returns:
+        pd.DataFrame with one typed column per schema entry
+    """
+    columns = {name: [None] * len(records) for name, _, _ in schema}
+    for i, record in enumerate(records):
+        for name, path, _ in schema:
+            columns[name][i] = _lookup(record, path)
+
+    groups = {}
+    for name, _, dtype in schema:
+        if dtype.startswith('category:'):
+            groups.setdefault(dtype, set()).update(v for v in columns[name] if v is not None)
+
+    data = {}
+    for name, _, dtype in schema:
+        values = columns[name]
+        if dtype == 'datetime':
+            data[name] = pd.to_datetime(pd.Series(values, dtype='string'), utc=True, format='ISO8601')
+        elif dtype.startswith('category:'):
+            data[name] = pd.Categorical(values, categories=sorted(groups[dtype]))
+        else:
+            data[name] = pd.array(values, dtype=dtype)
+    return pd.DataFrame(data)
+
+
+def decode_fixtures(fixtures_raw):
+    return decode(fixtures_raw, FIXTURE_SCHEMA)
+
+
+def decode_teams(teams_raw):
+    return decode(teams_raw, TEAM_SCHEMA)
+
+
+def decode_leagues(leagues_raw):
+    return decode(leagues_raw, LEAGUE_SCHEMA)
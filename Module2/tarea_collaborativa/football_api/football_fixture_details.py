@@ -0,0 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from columnar_store import ParquetStore
+from football_client import FIXTURE_IDS_PER_REQUEST
+from football_data_preprocessing import decode
+
+
+FINISHED_STATUSES = ['FT', 'AET', 'PEN']
+
+STATISTICS_SCHEMA = [
+    ('fixture_id', ('fixture_id',), 'int64'),
+    ('team.id', ('team', 'id'), 'Int64'),
+    ('team.name', ('team', 'name'), 'string'),
+    ('type', ('stat', 'type'), 'string'),
+    ('raw_value', ('stat', 'value'), 'string'),
+]
+
+EVENTS_SCHEMA = [
+    ('fixture_id', ('fixture_id',), 'int64'),
+    ('elapsed', ('event', 'time', 'elapsed'), 'Int16'),
+    ('extra', ('event', 'time', 'extra'), 'Int16'),
+    ('team.id', ('event', 'team', 'id'), 'Int64'),
+    ('team.name', ('event', 'team', 'name'), 'string'),
+    ('player.id', ('event', 'player', 'id'), 'Int64'),
+    ('player.name', ('event', 'player', 'name'), 'string'),
+    ('assist.id', ('event', 'assist', 'id'), 'Int64'),
+    ('assist.name', ('event', 'assist', 'name'), 'string'),
+    ('type', ('event', 'type'), 'string'),
+    ('detail', ('event', 'detail'), 'string'),
+]
+
+
+def decode_statistics(fixtures):
+    """Long table of the team statistics: one row per (fixture, team, statistic)."""
+    records = [
+        {
+            'fixture_id': fixture['fixture']['id'],
+            'team': team_stats['team'],
+            # i valori arrivano come int, "55%" o null
+            'stat': {'type': stat['type'], 'value': None if stat['value'] is None else str(stat['value'])},
+        }
+        for fixture in fixtures
+        for team_stats in fixture.get('statistics') or []
+        for stat in team_stats.get('statistics') or []
+    ]
+    statistics = decode(records, STATISTICS_SCHEMA)
+    statistics['value'] = pd.to_numeric(statistics['raw_value'].str.rstrip('%'), errors='coerce').astype('Float64')
+    return statistics
+
+
+def decode_events(fixtures):
+    """One row per match event (goals, cards, substitutions, VAR)."""
+    records = [
+        {'fixture_id': fixture['fixture']['id'], 'event': event}
+        for fixture in fixtures
+        for event in fixture.get('events') or []
+    ]
+    return decode(records, EVENTS_SCHEMA)
+
+
+class FixtureDetailStore:
+    """
+    Local tables of per-fixture statistics and events (Parquet stores under `path`),
+    plus the list of fixtures already fetched.
+    """
+
+    def __init__(self, path):
+        path = Path(path)
+        self.statistics = ParquetStore(path / "statistics")
+        self.events = ParquetStore(path / "events")
+        self.fetched = ParquetStore(path / "fetched")
+
+    def fetched_ids(self):
+        return set(self.fetched.read(columns=['fixture_id'])['fixture_id'].tolist())
+
+    def add(self, fixture_ids, fixtures):
+        key = f"fixtures_{min(fixture_ids)}_{max(fixture_ids)}_{len(fixture_ids)}"
+        self.statistics.append(decode_statistics(fixtures), key)
+        self.events.append(decode_events(fixtures), key)
+        # Per ultimo: un batch conta come scaricato solo se statistiche ed eventi sono salvati
+        self.fetched.append(pd.DataFrame({'fixture_id': pd.array(list(fixture_ids), dtype='int64')}), key)
+
+
+def ingest_fixture_details(client, fixture_ids, store, max_workers=4):
+    """
+    Fetches statistics and events of `fixture_ids` in multi-id batches of
+    FIXTURE_IDS_PER_REQUEST, running the batches concurrently under the client's rate
+    limit, and writes them to `store`. Fixtures already in the store are skipped.
+
+    Returns:
+        number of API requests made
+    """
+    done = store.fetched_ids()
+    missing = sorted(set(int(i) for i in fixture_ids) - done)
+    batches = [missing[i:i + FIXTURE_IDS_PER_REQUEST] for i in range(0, len(missing), FIXTURE_IDS_PER_REQUEST)]
+    if not batches:
+        return 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(client.get_fixtures_by_ids, batch): batch for batch in batches}
+        # Le scritture restano nel thread principale, man mano che i batch arrivano
+        for future in as_completed(futures):
+            store.add(futures[future], future.result())
+    return len(batches)
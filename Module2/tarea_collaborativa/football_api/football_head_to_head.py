@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+
+H2H_STATS = ['wins', 'draws', 'losses', 'goals_for', 'goals_against']
+
+
+class HeadToHead:
+    """
+    Team x team result tensor built in one pass over the team-match table.
+
+    `tensor[i, j]` holds wins, draws, losses, goals for and goals against of team i
+    against team j, across every fixture (and season) in the table. Heatmaps and
+    per-pair drill-downs are slices of the tensor.
+    """
+
+    def __init__(self, team_matches: pd.DataFrame):
+        team_names = team_matches['team'].astype(str).to_numpy()
+        opponent_names = team_matches['opponent'].astype(str).to_numpy()
+        self.teams = np.union1d(team_names, opponent_names)
+        self.team_index = {team: i for i, team in enumerate(self.teams)}
+
+        # Codici interi dei team: indici nell'array ordinato dei nomi
+        team = np.searchsorted(self.teams, team_names)
+        opponent = np.searchsorted(self.teams, opponent_names)
+        result = team_matches['result'].astype(str).to_numpy()
+
+        n = len(self.teams)
+        self.tensor = np.zeros((n, n, len(H2H_STATS)), dtype=np.int32)
+        values = np.column_stack([
+            result == 'W',
+            result == 'D',
+            result == 'L',
+            team_matches['goals_for'].to_numpy(),
+            team_matches['goals_against'].to_numpy(),
+        ])
+        np.add.at(self.tensor, (team, opponent), values)
+
+    def stat(self, name):
+        """Team x team matrix of one statistic (see H2H_STATS), as a NumPy array."""
+        return self.tensor[:, :, H2H_STATS.index(name)]
+
+    @property
+    def played(self):
+        return self.tensor[:, :, :3].sum(axis=2)
+
+    def matrix(self, metric='points_per_game'):
+        """
+        Team x team DataFrame of `metric`: one of H2H_STATS, 'played', 'goal_diff' or
+        'points_per_game' (NaN for pairs that never met).
+        """
+        if metric == 'played':
+            values = self.played
+        elif metric == 'goal_diff':
+            values = self.stat('goals_for') - self.stat('goals_against')
+        elif metric == 'points_per_game':
+            points = 3 * self.stat('wins') + self.stat('draws')
+            played = self.played
+            values = np.divide(points, played, out=np.full(points.shape, np.nan), where=played > 0)
+        else:
+            values = self.stat(metric)
+        return pd.DataFrame(values, index=self.teams, columns=self.teams)
+
+    def pair(self, team, opponent):
+        """Record of `team` against `opponent`: dict with played and every H2H_STATS entry."""
+        stats = self.tensor[self.team_index[team], self.team_index[opponent]]
+        record = dict(zip(H2H_STATS, stats.tolist()))
+        record['played'] = record['wins'] + record['draws'] + record['losses']
+        return record
@@ -0,0 +1,71 @@
+from football_data_preprocessing import decode
+
+
+# Una riga per (giocatore, competizione): `statistics` e' una lista nel JSON
+PLAYER_STATS_SCHEMA = [
+    ('player.id', ('player', 'id'), 'int64'),
+    ('player.name', ('player', 'name'), 'string'),
+    ('player.age', ('player', 'age'), 'Int16'),
+    ('player.nationality', ('player', 'nationality'), 'string'),
+    ('team.id', ('statistics', 'team', 'id'), 'Int64'),
+    ('team.name', ('statistics', 'team', 'name'), 'string'),
+    ('league.id', ('statistics', 'league', 'id'), 'Int64'),
+    ('league.season', ('statistics', 'league', 'season'), 'Int16'),
+    ('games.position', ('statistics', 'games', 'position'), 'string'),
+    ('games.appearences', ('statistics', 'games', 'appearences'), 'Int16'),
+    ('games.minutes', ('statistics', 'games', 'minutes'), 'Int32'),
+    ('games.rating', ('statistics', 'games', 'rating'), 'string'),
+    ('goals.total', ('statistics', 'goals', 'total'), 'Int16'),
+    ('goals.assists', ('statistics', 'goals', 'assists'), 'Int16'),
+    ('shots.total', ('statistics', 'shots', 'total'), 'Int16'),
+    ('shots.on', ('statistics', 'shots', 'on'), 'Int16'),
+    ('passes.total', ('statistics', 'passes', 'total'), 'Int32'),
+    ('passes.key', ('statistics', 'passes', 'key'), 'Int16'),
+    ('tackles.total', ('statistics', 'tackles', 'total'), 'Int16'),
+    ('duels.won', ('statistics', 'duels', 'won'), 'Int16'),
+    ('cards.yellow', ('statistics', 'cards', 'yellow'), 'Int16'),
+    ('cards.red', ('statistics', 'cards', 'red'), 'Int16'),
+]
+
+
+def decode_players(page):
+    """Decodes a page of the `players` endpoint, one row per player and competition."""
+    records = [
+        {'player': item['player'], 'statistics': stats}
+        for item in page
+        for stats in item.get('statistics') or [{}]
+    ]
+    return decode(records, PLAYER_STATS_SCHEMA)
+
+
+def ingest_players(client, league_id, season, store, teams=None):
+    """
+    Streams the squads (and player statistics) of every team of a league-season into `store`.
+
+    Pages are decoded and appended one at a time, so memory stays bounded by a single page.
+    Teams already in the store are skipped, so an interrupted ingest can be resumed.
+
+    Args:
+        client: FootballClient
+        league_id, season: competition to ingest
+        store: ParquetStore
+        teams: optional team ids, by default all the teams of the league-season
+
+    Returns:
+        number of rows written
+    """
+    if teams is None:
+        teams = [t['team']['id'] for t in client.get_teams(league_id, season)]
+
+    rows = 0
+    for team_id in teams:
+        done_key = f"players_{season}_{team_id}_done"
+        if store.has(done_key):
+            continue
+        for page_number, page in enumerate(client.iter_players(team_id, season), start=1):
+            df = decode_players(page)
+            store.append(df, key=f"players_{season}_{team_id}_{page_number:03d}")
+            rows += len(df)
+        # Marca il team come completato solo dopo l'ultima pagina
+        store.append(decode_players([]), key=done_key)
+    return rows
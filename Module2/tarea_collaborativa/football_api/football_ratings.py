@@ -0,0 +1,158 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+
+
+# Partite gia' applicate: servono a rigiocare la storia quando arriva una partita arretrata
+FIXTURE_COLUMNS = ['fixture_id', 'date', 'home', 'away', 'goal_diff']
+
+
+class EloRatings:
+    """
+    Incremental Elo ratings over the fixture history.
+
+    The state is array-backed (one rating per team id, so same-named teams of different
+    leagues stay apart) and keeps the fixtures it has already processed, so `update` with
+    a freshly synced team-match table only applies the new fixtures. Fixtures sharing a
+    kickoff time are updated together with vectorized NumPy operations. Every update is
+    also appended to a rating time series per team.
+
+    A new fixture older than the last processed one (e.g. a postponed game synced on a
+    later run) makes `update` replay the whole history, so the ratings always follow
+    date order.
+
+    Args:
+        k: update factor.
+        home_advantage: rating points added to the home team when computing the expected score.
+        initial: rating of a team seen for the first time.
+    """
+
+    def __init__(self, k=20.0, home_advantage=60.0, initial=1500.0):
+        self.k = k
+        self.home_advantage = home_advantage
+        self.initial = initial
+        self.team_ids = []
+        self.team_index = {}
+        self.names = {}  # team id -> ultimo nome visto
+        self.ratings = np.empty(0)
+        self._fixtures = {column: np.empty(0, dtype=dtype) for column, dtype in
+                          zip(FIXTURE_COLUMNS, ['int64', 'datetime64[ns]', 'int64', 'int64', 'int64'])}
+        self._history = {'fixture_id': [], 'date': [], 'team': [], 'rating': []}
+
+    def _codes(self, team_ids):
+        for team_id in pd.unique(team_ids):
+            if team_id not in self.team_index:
+                self.team_index[team_id] = len(self.team_ids)
+                self.team_ids.append(team_id)
+        if len(self.ratings) < len(self.team_ids):
+            self.ratings = np.concatenate([self.ratings, np.full(len(self.team_ids) - len(self.ratings), self.initial)])
+        return np.array([self.team_index[t] for t in team_ids], dtype=np.int64)
+
+    def _apply(self, home, away, goal_diff):
+        expected = 1 / (1 + 10 ** ((self.ratings[away] - self.ratings[home] - self.home_advantage) / 400))
+        score = np.sign(goal_diff) * 0.5 + 0.5
+        # Moltiplicatore per lo scarto di gol (World Football Elo)
+        margin = np.abs(goal_diff)
+        multiplier = np.select([margin <= 1, margin == 2], [1.0, 1.5], default=(11 + margin) / 8)
+        delta = self.k * multiplier * (score - expected)
+        np.add.at(self.ratings, home, delta)
+        np.add.at(self.ratings, away, -delta)
+
+    def _apply_fixtures(self, fixture_ids, dates, home, away, goal_diff):
+        # Blocchi di partite con lo stesso orario d'inizio: aggiornati insieme
+        starts = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]])
+        for start, end in zip(starts, np.r_[starts[1:], len(dates)]):
+            h, a = home[start:end], away[start:end]
+            if len(np.unique(np.r_[h, a])) < 2 * len(h):
+                # Un team compare due volte nello stesso blocco: aggiornamento sequenziale
+                for i in range(start, end):
+                    self._apply(home[i:i + 1], away[i:i + 1], goal_diff[i:i + 1])
+            else:
+                self._apply(h, a, goal_diff[start:end])
+
+            teams = np.r_[h, a]
+            self._history['fixture_id'].append(np.tile(fixture_ids[start:end], 2))
+            self._history['date'].append(np.tile(dates[start:end], 2))
+            self._history['team'].append(teams)
+            self._history['rating'].append(self.ratings[teams])
+
+    def update(self, team_matches: pd.DataFrame):
+        """
+        Applies the fixtures of `team_matches` that were not processed yet, in date order
+        (replaying the history if one of them is older than the last processed fixture).
+
+        Returns:
+            number of new fixtures processed
+        """
+        fixtures = team_matches[team_matches['side'] == 'home']
+        fixtures = fixtures[~fixtures['fixture_id'].isin(self._fixtures['fixture_id'])]
+        if fixtures.empty:
+            return 0
+
+        self.names.update(zip(fixtures['team_id'], fixtures['team'].astype(str)))
+        self.names.update(zip(fixtures['opponent_id'], fixtures['opponent'].astype(str)))
+        new = {
+            'fixture_id': fixtures['fixture_id'].to_numpy(dtype=np.int64),
+            'date': fixtures['date'].dt.tz_convert(None).to_numpy(dtype='datetime64[ns]'),  # UTC
+            'home': self._codes(fixtures['team_id'].to_numpy()),
+            'away': self._codes(fixtures['opponent_id'].to_numpy()),
+            'goal_diff': (fixtures['goals_for'] - fixtures['goals_against']).to_numpy(dtype=np.int64),
+        }
+        replay = len(self._fixtures['date']) > 0 and new['date'].min() < self._fixtures['date'].max()
+
+        if replay:
+            # Partita arretrata: si riparte dai rating iniziali con tutta la storia in ordine di data
+            self.ratings[:] = self.initial
+            self._history = {column: [] for column in self._history}
+            new = {column: np.r_[self._fixtures[column], new[column]] for column in FIXTURE_COLUMNS}
+            self._fixtures = {column: np.empty(0, dtype=values.dtype) for column, values in new.items()}
+
+        order = np.lexsort((new['fixture_id'], new['date']))
+        new = {column: values[order] for column, values in new.items()}
+        self._apply_fixtures(*(new[column] for column in FIXTURE_COLUMNS))
+        self._fixtures = {column: np.r_[self._fixtures[column], new[column]] for column in FIXTURE_COLUMNS}
+        return len(fixtures)
+
+    def table(self):
+        """Current ratings, best first."""
+        return pd.DataFrame({
+            'team_id': self.team_ids,
+            'team': [self.names[t] for t in self.team_ids],
+            'rating': self.ratings,
+        }).sort_values('rating', ascending=False, ignore_index=True)
+
+    def history(self, teams=None):
+        """
+        Rating after every processed fixture, optionally only for the team names in `teams`.
+
+        Returns:
+            pd.DataFrame with columns: fixture_id, date, team_id, team, rating
+        """
+        if not self._history['team']:
+            return pd.DataFrame(columns=['fixture_id', 'date', 'team_id', 'team', 'rating'])
+        codes = np.concatenate(self._history['team'])
+        team_ids = np.asarray(self.team_ids)[codes]
+        history = pd.DataFrame({
+            'fixture_id': np.concatenate(self._history['fixture_id']),
+            'date': pd.to_datetime(np.concatenate(self._history['date']), utc=True),
+            'team_id': team_ids,
+            'team': np.asarray([self.names[t] for t in self.team_ids], dtype=object)[codes],
+            'rating': np.concatenate(self._history['rating']),
+        })
+        if teams is not None:
+            history = history[history['team'].isin(teams)]
+        return history.sort_values(['date', 'fixture_id'], kind='stable', ignore_index=True)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            ratings = pickle.load(f)
+        if not hasattr(ratings, 'team_ids'):
+            # Stato salvato quando i rating erano per nome del team
+            raise ValueError(f"{path} keys the ratings by team name: delete it to rebuild them by team id")
+        return ratings
@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+
+RESULT_CODES = np.array(['', 'W', 'D', 'L'])
+
+
+class LeagueStandings:
+    """
+    League table engine built once from the team-match table.
+
+    Every statistic is stored as a cumulative (team x matchday) NumPy matrix, and the
+    positions for every matchday are computed in one vectorized lexsort, so
+    "table as of matchday k", position history and form are array slices.
+
+    Tiebreakers: points, goal difference, goals scored, team name.
+    """
+
+    def __init__(self, team_matches: pd.DataFrame):
+        codes, teams = pd.factorize(team_matches['team'].astype(str), sort=True)
+        self.teams = np.asarray(teams)
+        self.team_index = {team: i for i, team in enumerate(self.teams)}
+
+        n_teams = len(self.teams)
+        self.n_matchdays = int(team_matches['matchday'].max()) if len(team_matches) else 0
+        md = team_matches['matchday'].to_numpy() - 1
+        cell = (codes, md)
+
+        def per_matchday(values):
+            out = np.zeros((n_teams, self.n_matchdays), dtype=np.int32)
+            np.add.at(out, cell, values)
+            return out
+
+        result = team_matches['result'].astype(str).to_numpy()
+        self.played = per_matchday(1).cumsum(axis=1)
+        self.won = per_matchday(result == 'W').cumsum(axis=1)
+        self.drawn = per_matchday(result == 'D').cumsum(axis=1)
+        self.lost = per_matchday(result == 'L').cumsum(axis=1)
+        self.goals_for = per_matchday(team_matches['goals_for'].to_numpy()).cumsum(axis=1)
+        self.goals_against = per_matchday(team_matches['goals_against'].to_numpy()).cumsum(axis=1)
+        self.points = per_matchday(team_matches['points'].to_numpy()).cumsum(axis=1)
+        self.goal_diff = self.goals_for - self.goals_against
+
+        # Ordine della classifica per ogni giornata (colonna): lexsort usa l'ultima chiave come primaria
+        name_rank = np.broadcast_to(np.arange(n_teams)[:, None], self.points.shape)
+        self.order = np.lexsort((name_rank, -self.goals_for, -self.goal_diff, -self.points), axis=0)
+        self.positions = np.empty_like(self.order)
+        ranks = np.broadcast_to(np.arange(1, n_teams + 1)[:, None], self.order.shape)
+        np.put_along_axis(self.positions, self.order, ranks, axis=0)
+
+        # Risultati in ordine cronologico per team (team x partita giocata), per la forma
+        game_number = team_matches.groupby(codes).cumcount().to_numpy()
+        self.results = np.zeros((n_teams, int(self.played[:, -1].max()) if n_teams else 0), dtype=np.int8)
+        self.results[codes, game_number] = pd.Categorical(result, categories=RESULT_CODES[1:]).codes + 1
+
+    def _column(self, matchday):
+        if matchday is None:
+            return self.n_matchdays - 1
+        if not 1 <= matchday <= self.n_matchdays:
+            raise ValueError(f"matchday must be between 1 and {self.n_matchdays}, got {matchday}")
+        return matchday - 1
+
+    def form(self, matchday=None, last_n=5):
+        """Last `last_n` results per team (e.g. 'WWDLW', oldest first) as of `matchday`."""
+        k = self._column(matchday)
+        played = self.played[:, k]
+        cols = played[:, None] - last_n + np.arange(last_n)
+        valid = cols >= 0
+        codes = np.where(valid, self.results[np.arange(len(self.teams))[:, None], np.clip(cols, 0, None)], 0)
+        return np.array([''.join(row) for row in RESULT_CODES[codes]])
+
+    def table(self, matchday=None, with_form=True):
+        """
+        League table as of `matchday` (default: last one).
+
+        Returns:
+            pd.DataFrame sorted by position with columns:
+                position, team, played, won, drawn, lost, goals_for, goals_against, goal_diff, points[, form]
+        """
+        k = self._column(matchday)
+        order = self.order[:, k]
+        table = pd.DataFrame({
+            'position': np.arange(1, len(order) + 1),
+            'team': self.teams[order],
+            'played': self.played[order, k],
+            'won': self.won[order, k],
+            'drawn': self.drawn[order, k],
+            'lost': self.lost[order, k],
+            'goals_for': self.goals_for[order, k],
+            'goals_against': self.goals_against[order, k],
+            'goal_diff': self.goal_diff[order, k],
+            'points': self.points[order, k],
+        })
+        if with_form:
+            table['form'] = self.form(matchday)[order]
+        return table
+
+    def position_history(self, teams=None):
+        """
+        Position of each team after every matchday.
+
+        Returns:
+            pd.DataFrame in long format with columns: team, matchday, position
+        """
+        rows = np.arange(len(self.teams)) if teams is None else np.array([self.team_index[t] for t in teams])
+        positions = self.positions[rows]
+        return pd.DataFrame({
+            'team': np.repeat(self.teams[rows], self.n_matchdays),
+            'matchday': np.tile(np.arange(1, self.n_matchdays + 1), len(rows)),
+            'position': positions.ravel(),
+        })
+
+    def all_tables(self):
+        """
+        League table after every matchday, stacked in long format.
+
+        Returns:
+            pd.DataFrame with columns: matchday, position, team, played, won, drawn, lost,
+            goals_for, goals_against, goal_diff, points
+        """
+        n_teams = len(self.teams)
+
+        def by_position(matrix):
+            return np.take_along_axis(matrix, self.order, axis=0).T.ravel()
+
+        return pd.DataFrame({
+            'matchday': np.repeat(np.arange(1, self.n_matchdays + 1), n_teams),
+            'position': np.tile(np.arange(1, n_teams + 1), self.n_matchdays),
+            'team': self.teams[self.order.T.ravel()],
+            'played': by_position(self.played),
+            'won': by_position(self.won),
+            'drawn': by_position(self.drawn),
+            'lost': by_position(self.lost),
+            'goals_for': by_position(self.goals_for),
+            'goals_against': by_position(self.goals_against),
+            'goal_diff': by_position(self.goal_diff),
+            'points': by_position(self.points),
+        })
@@ -1,25 +1,32 @@
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
 import pandas as pd
 import numpy as np
 import plotly.express as px
-import streamlit as st
+import plotly.graph_objects as go
 
 
 
-def donut_side_chart(df_fixtures, side='home'):
-    # --- Prepara i dati come nel codice Plotly ---
-    # Calcolo W/D/L per team in casa
-    home = df_fixtures.groupby(f'teams.{side}.name')[f'teams.{side}.winner'] \
-            .value_counts().unstack().fillna(0)
-    home.columns = ['Loss','Win']  # attenzione: vero/falso → Win/Loss
-    home['Draw'] = df_fixtures[df_fixtures[f'teams.{side}.winner'].isnull()] \
-                .groupby(f'teams.{side}.name').size()
-    home = home.fillna(0)  # in caso di team senza pareggi
-    home = home[['Win','Draw','Loss']].reset_index()
+RESULT_COLORS = {'Win': '#2ecc71', 'Draw': '#f1c40f', 'Loss': '#e74c3c'}
+
+
+def _side_results(team_matches, side):
+    # W/D/L per team sul lato selezionato, ordinato per nome del team
+    results = team_matches[team_matches['side'] == side] \
+            .groupby('team', observed=True)['result'].value_counts().unstack(fill_value=0)
+    results = results.reindex(columns=['W', 'D', 'L'], fill_value=0).sort_index()
+    results.columns = ['Win', 'Draw', 'Loss']
+    return results
+
+
+def donut_side_chart(team_matches, side='home'):
+    # matplotlib serve solo a questa versione del grafico: import differito
+    import matplotlib.pyplot as plt
+    import matplotlib.patches as mpatches
+
+    # --- Prepara i dati: W/D/L per team sul lato selezionato ---
+    home = _side_results(team_matches, side).reset_index()
 
     # --- Parametri di layout ---
-    teams = sorted(home[f'teams.{side}.name'].unique())
+    teams = sorted(home['team'].unique())
     teams_per_row = 4
     n_rows = int(np.ceil(len(teams) / teams_per_row))
 
@@ -29,11 +36,11 @@ def donut_side_chart(df_fixtures, side='home'):
     # --- Loop per ogni team ---
     for idx, row in home.iterrows():
         ax = axes[idx]
-        team = row[f'teams.{side}.name']
+        team = row['team']
         values = [row['Win'], row['Draw'], row['Loss']]
         total = sum(values)
         labels = ['Win', 'Draw', 'Loss']
-        colors = {'Win': '#2ecc71', 'Draw': '#f1c40f', 'Loss': '#e74c3c'}
+        colors = RESULT_COLORS
 
         wedges, texts = ax.pie(
             values,
@@ -76,13 +83,117 @@ def donut_side_chart(df_fixtures, side='home'):
     return fig, ax
 
 
+def donut_side_chart_plotly(team_matches, side='home', teams_per_row=4):
+    """
+    Versione veloce di `donut_side_chart`: un'unica figura Plotly con una traccia
+    Pie per team, posizionata tramite `domain`, costruita direttamente dagli array W/D/L.
+    """
+    results = _side_results(team_matches, side)
+    teams = results.index.astype(str).to_numpy()
+    values = results.to_numpy()
+    points = values @ np.array([3, 1, 0])
+
+    n_rows = int(np.ceil(len(teams) / teams_per_row))
+    idx = np.arange(len(teams))
+    row, col = idx // teams_per_row, idx % teams_per_row
+    cell_w, cell_h = 1 / teams_per_row, 1 / max(n_rows, 1)
+    pad_w, pad_h = cell_w * 0.08, cell_h * 0.18  # spazio per il titolo del team
+    x0, x1 = col * cell_w + pad_w, (col + 1) * cell_w - pad_w
+    y1 = 1 - row * cell_h - pad_h
+    y0 = 1 - (row + 1) * cell_h + pad_h * 0.2
+    labels = list(RESULT_COLORS)
+    colors = list(RESULT_COLORS.values())
+
+    fig = go.Figure()
+    for i in idx:
+        fig.add_trace(go.Pie(
+            labels=labels,
+            values=values[i],
+            hole=0.6,
+            sort=False,
+            direction='counterclockwise',
+            rotation=90,
+            marker=dict(colors=colors, line=dict(color='white', width=1)),
+            texttemplate='%{percent:.0%}<br>(%{value})',
+            textfont_size=9,
+            hovertemplate=f'<b>{teams[i]}</b><br>%{{label}}: %{{value}}<extra></extra>',
+            domain=dict(x=[x0[i], x1[i]], y=[y0[i], y1[i]]),
+            showlegend=bool(i == 0),
+        ))
+
+    # Titolo e punti al centro di ogni donut
+    cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+    annotations = [
+        dict(x=cx[i], y=cy[i], text=f'<b>{points[i]}</b><br>Points', showarrow=False, font_size=13)
+        for i in idx
+    ] + [
+        dict(x=cx[i], y=y1[i] + pad_h * 0.1, text=teams[i], showarrow=False, font_size=13, yanchor='bottom')
+        for i in idx
+    ]
+
+    fig.update_layout(
+        title=f"{side.capitalize()} Results and Points per Team",
+        annotations=annotations,
+        legend=dict(orientation='h', x=0.5, xanchor='center', y=1.06),
+        height=max(n_rows, 1) * 230 + 80,
+        margin=dict(l=10, r=10, t=90, b=10),
+    )
+    return fig
+
+
+def position_history_chart(standings, teams=None):
+    history = standings.position_history(teams)
+
+    fig = px.line(history, x='matchday', y='position', color='team', markers=True,
+                title="League Position per Matchday")
+    fig.update_yaxes(autorange='reversed', dtick=1, title='Position')
+    fig.update_xaxes(title='Matchday')
+    return fig
+
+
+def head_to_head_heatmap(h2h, metric='points_per_game'):
+    matrix = h2h.matrix(metric)
+    played = h2h.matrix('played')
+
+    fig = go.Figure(go.Heatmap(
+        z=matrix.to_numpy(),
+        x=matrix.columns,
+        y=matrix.index,
+        customdata=played.to_numpy(),
+        colorscale='RdYlGn' if metric in ('points_per_game', 'goal_diff', 'wins') else 'Blues',
+        hovertemplate='<b>%{y}</b> vs %{x}<br>' + metric + ': %{z:.2f}<br>Played: %{customdata}<extra></extra>',
+    ))
+    fig.update_layout(
+        title=f"Head to Head - {metric.replace('_', ' ').capitalize()} (row team vs column team)",
+        height=max(400, 28 * len(matrix) + 150),
+        yaxis=dict(autorange='reversed'),
+    )
+    return fig
+
+
+def rating_trend_chart(ratings, teams):
+    history = ratings.history(teams)
+
+    fig = px.line(history, x='date', y='rating', color='team', markers=True,
+                title="Elo Rating over Time")
+    fig.update_layout(xaxis_title="Match Date", yaxis_title="Elo rating")
+    return fig
+
+
+def match_stat_chart(statistics, stat_type):
+    per_team = statistics[statistics['type'] == stat_type] \
+            .groupby('team.name')['value'].mean().sort_values(ascending=False).reset_index()
+
+    fig = px.bar(per_team, x='team.name', y='value',
+                title=f"{stat_type} per Match (average)",
+                labels={'team.name': 'Team', 'value': stat_type})
+    return fig
+
+
 # Prepara df gol fatti/subiti
-def goal_scored_vs_conceeded(df_fixtures):
-    home = df_fixtures[['teams.home.name','goals.home','goals.away', 'teams.away.name']].copy()
-    home.columns = ['team','scored','conceded', 'opponent']
-    away = df_fixtures[['teams.away.name','goals.away','goals.home', 'teams.home.name']].copy()
-    away.columns = ['team','scored','conceded', 'opponent']
-    goals = pd.concat([home, away])
+def goal_scored_vs_conceeded(team_matches):
+    goals = team_matches[['team', 'goals_for', 'goals_against', 'opponent']] \
+            .rename(columns={'goals_for': 'scored', 'goals_against': 'conceded'})
 
     fig = px.bar(goals, x='team', y=['scored','conceded'],
                 barmode='group',
@@ -92,38 +203,23 @@ def goal_scored_vs_conceeded(df_fixtures):
     return fig
 
 
-def cumulative_points(df_fixtures):
-    # Calcola punti per match
-    def points(row, side):
-        if row[f'teams.{side}.winner'] == True: return 3
-        if row[f'teams.{side}.winner'] == False: return 0
-        return 1
-
-    # Unisci e ordina per data
-    home = df_fixtures[['fixture.date','teams.home.name']].copy()
-    home['points'] = df_fixtures.apply(lambda r: points(r,'home'), axis=1)
-    home.columns = ['date','team','points']
-    away = df_fixtures[['fixture.date','teams.away.name']].copy()
-    away['points'] = df_fixtures.apply(lambda r: points(r,'away'), axis=1)
-    away.columns = ['date','team','points']
-
-    points_df = pd.concat([home,away]).sort_values('date')
-    points_df['cum_points'] = points_df.groupby('team')['points'].cumsum()
+def cumulative_points(team_matches):
+    # team_matches e' gia' ordinato per data
+    points_df = team_matches[['date', 'team', 'points']].copy()
+    points_df['cum_points'] = points_df.groupby('team', observed=True)['points'].cumsum()
 
     fig = px.line(points_df, x='date', y='cum_points', color='team',
                 title="Cumulative Points per Team over Time")
     return fig
 
 
-def home_v_away_wins(df_fixtures, n_teams):
+def home_v_away_wins(team_matches, n_teams):
     # Calcola pct vittorie casa e trasferta
-    home_perf = (df_fixtures.groupby('teams.home.name')['teams.home.winner'] \
-                .sum().rename('home_win_pct') / (n_teams-1)) * 100
-    away_perf = ((df_fixtures.groupby('teams.away.name')['teams.away.winner'] \
-                .sum().rename('away_win_pct') / (n_teams-1))) * 100
-    perf = pd.concat([home_perf, away_perf], axis=1).reset_index()
+    wins = team_matches['result'].eq('W').groupby([team_matches['team'], team_matches['side']], observed=True).sum()
+    perf = (wins.unstack(fill_value=0).reindex(columns=['home', 'away'], fill_value=0) / (n_teams-1)) * 100
+    perf = perf.rename(columns={'home': 'home_win_pct', 'away': 'away_win_pct'}).reset_index()
 
-    fig = px.scatter(perf, x='home_win_pct', y='away_win_pct', text='index',
+    fig = px.scatter(perf, x='home_win_pct', y='away_win_pct', text='team',
                     title="Home vs Away Win %", labels={
                         'home_win_pct':'Home Win %',
                         'away_win_pct':'Away Win %'
@@ -132,12 +228,13 @@ def home_v_away_wins(df_fixtures, n_teams):
     return fig
 
 
-def win_per_weekday_distribution(df_fixtures):
-    df_fixtures['weekday'] = pd.to_datetime(df_fixtures['fixture.date']).dt.day_name()
-    home_w = df_fixtures[df_fixtures['teams.home.winner'] == True].groupby('weekday').size()
-    away_w = df_fixtures[df_fixtures['teams.away.winner'] == True].groupby('weekday').size()
-    win_df = pd.concat([home_w, away_w], axis=1).fillna(0)
+def win_per_weekday_distribution(team_matches):
+    wins = team_matches[team_matches['result'] == 'W']
+    weekday = wins['date'].dt.day_name()
+    win_df = pd.crosstab(weekday, wins['side'].astype(str)) \
+            .reindex(columns=['home', 'away'], fill_value=0)
     win_df.columns = ['home_wins', 'away_wins']
+    win_df.index.name = 'weekday'
 
     win_df = win_df.reset_index().melt(id_vars='weekday', var_name='result', value_name='wins')
 
@@ -164,39 +261,17 @@ def win_per_weekday_distribution(df_fixtures):
 
 
 
-def team_trend_analysis(df_fixtures, team):
-    # Mappa il risultato in punti (3 per vittoria, 1 per pareggio, -3 per sconfitta)
-    def calculate_points(row, side):
-        if side == 'home':
-            if row[f'teams.{side}.winner'] == True: 
-                return 3
-            elif row[f'teams.{side}.winner'] == False: 
-                return 0
-            else:
-                return 1  # pareggio
-        else:
-            if row[f'teams.{side}.winner'] == True: 
-                return 3
-            elif row[f'teams.{side}.winner'] == False: 
-                return 0
-            else:
-                return 1  # pareggio
-
-    # Creiamo un nuovo dataframe con i risultati in punti per casa (home) e trasferta (away)
-    home_games = df_fixtures.loc[(df_fixtures[f'teams.home.name'] == team), ['fixture.date', 'teams.home.name', 'teams.away.name', 'teams.home.winner', 'goals.home', 'goals.away']].copy()
-    home_games['home_away'] = 'H'
-    home_games['home_points'] = home_games.apply(lambda row: calculate_points(row, 'home'), axis=1)
-    home_games['label'] = home_games['teams.home.name'] + ' vs ' + home_games['teams.away.name'] + ' | ' + home_games['goals.home'].astype(str) + '-' + home_games['goals.away'].astype(str)
-    home_games = home_games.rename(columns={'teams.home.name': 'team', 'teams.away.name': 'opponent', 'home_points': 'points'})
-
-    away_games = df_fixtures.loc[(df_fixtures[f'teams.away.name'] == team), ['fixture.date', 'teams.away.name', 'teams.home.name',  'teams.away.winner', 'goals.home', 'goals.away']].copy()
-    away_games['home_away'] = 'A'
-    away_games['away_points'] = away_games.apply(lambda row: calculate_points(row, 'away'), axis=1)
-    away_games['label'] = away_games['teams.home.name'] + ' vs ' + away_games['teams.away.name'] + ' | ' + away_games['goals.home'].astype(str) + '-' + away_games['goals.away'].astype(str)
-    away_games = away_games.rename(columns={'teams.away.name': 'team', 'teams.home.name': 'opponent', 'away_points': 'points'})
-
-    # Uniamo i dati delle partite in casa e in trasferta
-    all_games = pd.concat([home_games, away_games])
+def team_trend_analysis(team_matches, team):
+    # Partite della squadra (casa e trasferta) dalla tabella team-match
+    all_games = team_matches[team_matches['team'] == team].copy()
+    is_home = (all_games['side'] == 'home').to_numpy()
+    home_name = np.where(is_home, all_games['team'].astype(str), all_games['opponent'].astype(str))
+    away_name = np.where(is_home, all_games['opponent'].astype(str), all_games['team'].astype(str))
+    home_goals = np.where(is_home, all_games['goals_for'], all_games['goals_against'])
+    away_goals = np.where(is_home, all_games['goals_against'], all_games['goals_for'])
+    all_games['home_away'] = np.where(is_home, 'H', 'A')
+    all_games['label'] = (pd.Series(home_name, index=all_games.index) + ' vs ' + away_name + ' | '
+                          + home_goals.astype(str) + '-' + away_goals.astype(str))
 
     # Aggiungiamo i colori in base al risultato
     result_to_color = {3: 'green', 1: 'yellow', 0: 'red'}
@@ -205,18 +280,17 @@ def team_trend_analysis(df_fixtures, team):
     
     all_games['color'] = all_games['points'].map(result_to_color)
     all_games['level'] = all_games['points'].map(result_to_level)
-    all_games = all_games.sort_values(by='fixture.date')
     all_games['level'] = pd.Categorical(all_games['level'])
     
     # Creiamo il grafico a barre
     fig = px.bar(all_games, 
-                x='fixture.date', 
+                x='date', 
                 y='level', 
                 color='level', 
                 title=f'Match Results (Points) for {team}',
                 labels={'home_away': 'Home/Away', 'points': 'Points'},
                 color_discrete_map=level_to_color,
-                hover_data={'opponent': True, 'points': True, 'fixture.date': True, 'team': False, 'label': True, 'level':False},
+                hover_data={'opponent': True, 'points': True, 'date': True, 'team': False, 'label': True, 'level':False},
                 )
 
     # Personalizziamo il layout
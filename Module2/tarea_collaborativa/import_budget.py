@@ -0,0 +1,68 @@
+"""
+Measures the cold import time of the core (UI-agnostic) modules and of the app modules.
+
+Each module is imported in a fresh interpreter from its app folder. The script fails
+when a module goes over its time budget or when a core module pulls in the UI stack.
+
+Usage:
+    python import_budget.py
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+UI_STACK = ("streamlit", "plotly", "matplotlib", "mplsoccer", "highlight_text", "PIL")
+
+# (cartella, modulo, budget in ms, True se il modulo non deve caricare lo stack UI)
+BUDGETS = [
+    ("football_api", "football_client", 300, True),
+    ("football_api", "football_data_preprocessing", 800, True),
+    ("football_api", "football_standings", 800, True),
+    ("football_api", "football_batch", 1000, True),
+    ("football_api", "api_football_calls", 1500, False),
+    ("football_api", "viz", 1200, False),
+    ("f1", "f1_client", 300, True),
+    ("f1", "f1_data_preprocessing", 800, True),
+    ("f1", "f1_data_viz", 800, True),
+    ("f1", "f1_ingest", 1000, True),
+    ("f1", "api_f1_call", 1500, False),
+    (".", "common.prefetch", 300, True),
+]
+
+PROBE = """
+import sys, time
+t = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - t) * 1000
+loaded = [m for m in {ui_stack!r} if m in sys.modules]
+print(round(elapsed), ",".join(loaded))
+"""
+
+
+def measure(folder, module):
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, ui_stack=UI_STACK)],
+        cwd=HERE / folder, capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return int(out[0]), (out[1].split(",") if len(out) > 1 else [])
+
+
+def main():
+    failures = 0
+    for folder, module, budget, ui_free in BUDGETS:
+        elapsed, loaded = measure(folder, module)
+        problems = []
+        if elapsed > budget:
+            problems.append(f"over budget ({budget} ms)")
+        if ui_free and loaded:
+            problems.append(f"imports {', '.join(loaded)}")
+        failures += bool(problems)
+        status = "FAIL " + "; ".join(problems) if problems else "ok"
+        print(f"{folder + '/' + module:<42} {elapsed:>5} ms  {status}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()